@@ -20,6 +20,8 @@
 #
 ##############################################################################
 
+from . import controllers
 from . import models
+from .hooks import uninstall_hook
 
 # vim:expandtab:smartindent:tabstop=4:softtabstop=4:shiftwidth=4:
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#
+# Extensible Account Entries Analysis Report
+# Copyright (C) 2016 OpusVL (<http://opusvl.com/>)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+##############################################################################
+
+import csv
+import json
+from cStringIO import StringIO
+
+from openerp import api, http, tools
+from openerp.http import request
+
+
+class EntriesReportExport(http.Controller):
+
+    @http.route('/account_entries_report/export', type='http', auth='user')
+    def export(self, domain='[]', fields='', batch_size='5000', **kwargs):
+        """Stream rows of the Entries Analysis report as CSV, as they are fetched.
+
+        domain is a JSON encoded domain, fields a comma separated list of report columns (all of them by default).
+        """
+        domain = json.loads(domain)
+        batch_size = int(batch_size)
+        report = request.env['account.entries.report']
+        report.check_access_rights('read')
+        field_names = report._export_field_names([name for name in fields.split(',') if name])
+        headings = [report._fields[name].string for name in field_names]
+        registry, uid, context = request.registry, request.uid, dict(request.context)
+
+        def generate():
+            # The request's cursor is closed by the time the response body is sent, so use one of our own.
+            with api.Environment.manage(), registry.cursor() as cr:
+                env = api.Environment(cr, uid, context)
+                rows = env['account.entries.report']._iter_export_rows(domain, field_names, batch_size=batch_size)
+                buf = StringIO()
+                writer = csv.writer(buf)
+                writer.writerow([tools.ustr(heading).encode('utf-8') for heading in headings])
+                for count, row in enumerate(rows, 1):
+                    writer.writerow([tools.ustr(value).encode('utf-8') if value is not None else '' for value in row])
+                    if count % batch_size == 0:
+                        yield buf.getvalue()
+                        buf.seek(0)
+                        buf.truncate()
+                yield buf.getvalue()
+
+        return request.make_response(generate(), headers=[
+            ('Content-Type', 'text/csv; charset=utf-8'),
+            ('Content-Disposition', 'attachment; filename="entries_analysis.csv"'),
+        ])
+
+# vim:expandtab:smartindent:tabstop=4:softtabstop=4:shiftwidth=4:
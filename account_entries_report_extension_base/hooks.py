@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#
+# Extensible Account Entries Analysis Report
+# Copyright (C) 2016 OpusVL (<http://opusvl.com/>)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+##############################################################################
+
+from openerp import tools
+
+from .indexes import REFRESH_INDEXES, REPORT_INDEXES
+from .read_group_cache import drop_generation_table
+from .models.account_entries_report import (
+    BUILD_SCHEMA, FINGERPRINT_PARAM, MATERIALIZED_TABLE, drop_materialized_log, plain_view_definition,
+)
+
+
+def uninstall_hook(cr, registry):
+    """Drop the indexes and triggers this module made on the tables of core Odoo, and the tables and views holding
+    precomputed report data, and put the plain account_entries_report view of core Odoo back in place.
+    """
+    for name, table, columns, include, where in REPORT_INDEXES + REFRESH_INDEXES:
+        cr.execute("drop index if exists {name}".format(name=name))
+    drop_materialized_log(cr)
+    tools.drop_view_if_exists(cr, 'account_entries_report')
+    # The partitions go along with the table they inherit from.
+    cr.execute("drop table if exists {table} cascade".format(table=MATERIALIZED_TABLE))
+    cr.execute("drop schema if exists {build} cascade".format(build=BUILD_SCHEMA))
+    cr.execute("drop materialized view if exists account_entries_report_summary")
+    drop_generation_table(cr)
+    cr.execute(plain_view_definition(registry['account.entries.report']))
+    cr.execute("delete from ir_config_parameter where key = %s", (FINGERPRINT_PARAM,))
+
+# vim:expandtab:smartindent:tabstop=4:softtabstop=4:shiftwidth=4:
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#
+# Extensible Account Entries Analysis Report
+# Copyright (C) 2016 OpusVL (<http://opusvl.com/>)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+##############################################################################
+
+"""Indexes this module keeps on the tables of core Odoo, built as account_extras_database/indexes.py does.
+"""
+
+from openerp.addons.account_extras_database import indexes as database
+# Used by the models of this module.
+from openerp.addons.account_extras_database.indexes import drop_indexes, ensure_indexes
+
+# Indexes for the usual filters of the report view, which filters and joins on these columns: a period or date range
+# picks moves (am.period_id, am.date), whose lines are found through l.move_id; an account type or account picks
+# accounts, whose lines are found through l.account_id; a partner picks lines through l.partner_id.  The indexes on the
+# lines are partial on the condition of the view, and carry the columns of the other joins and the measures along, so
+# that these queries need not visit the table for the lines they sum, as (name, table, key columns, included columns,
+# condition).  Only wanted in the view mode, as the materialized table has indexes of its own, and dropped in the
+# materialized mode.
+REPORT_INDEXES = [
+    ('account_move_entries_report_period_index', 'account_move', 'period_id', 'id', None),
+    ('account_move_entries_report_date_index', 'account_move', 'date', 'id', None),
+    ('account_move_line_entries_report_move_index', 'account_move_line', 'move_id',
+     'account_id, partner_id, debit, credit', "state != 'draft'"),
+    ('account_move_line_entries_report_account_index', 'account_move_line', 'account_id',
+     'move_id, partner_id, debit, credit', "state != 'draft'"),
+    ('account_move_line_entries_report_partner_index', 'account_move_line', 'partner_id, account_id',
+     'move_id, debit, credit', "state != 'draft'"),
+]
+
+# Indexes on write_date, without which every incremental refresh of the materialized report would scan all of
+# account_move_line to find what changed, as (name, table, key columns, included columns, condition).  Only wanted in
+# the materialized mode.
+REFRESH_INDEXES = [
+    ('account_move_line_write_date_index', 'account_move_line', 'write_date', None, None),
+    ('account_move_write_date_index', 'account_move', 'write_date', None, None),
+]
+
+
+def wanted_indexes(cr):
+    """Return the indexes this module wants on the database of cr, in the current mode of the report.
+    """
+    # The parameter is MATERIALIZED_PARAM of models/account_entries_report.py, read here without the registry.
+    cr.execute("select value from ir_config_parameter where key = %s",
+               ('account_entries_report_extension_base.materialized',))
+    row = cr.fetchone()
+    if row and (row[0] or '').strip().lower() in ('1', 'true', 'yes'):
+        return list(REFRESH_INDEXES)
+    return list(REPORT_INDEXES)
+
+
+def build_indexes(cr):
+    """Build the missing indexes concurrently, on cr, a cursor in autocommit mode, for scripts/build_indexes.py.
+    """
+    database.build_indexes(cr, wanted_indexes(cr))
+
+# vim:expandtab:smartindent:tabstop=4:softtabstop=4:shiftwidth=4:
@@ -24,6 +24,12 @@ from . import (
 
     account_entries_report,
 
+    account_entries_report_summary,
+
+    account_entries_report_aging,
+
+    account_move,
+
 )
 
 # vim:expandtab:smartindent:tabstop=4:softtabstop=4:shiftwidth=4:
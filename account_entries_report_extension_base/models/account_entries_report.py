@@ -20,66 +20,859 @@
 #
 ##############################################################################
 
-from openerp import tools
+import hashlib
+import json
+import logging
+import re
+import time
+import zlib
+from collections import OrderedDict
+
+import psycopg2
+from lxml import etree
+
+from openerp import tools, SUPERUSER_ID
 from openerp import models, fields, api
+from openerp.exceptions import Warning
+from openerp.tools.translate import _
+
+from openerp.addons.account_extras_database import export
+from openerp.addons.account_extras_database.replica import call_with_replica
+
+from .. import indexes
+from .. import read_group_cache as cache
+
+_logger = logging.getLogger(__name__)
+
+MATERIALIZED_PARAM = 'account_entries_report_extension_base.materialized'
+LAST_REFRESH_PARAM = 'account_entries_report_extension_base.last_refresh'
+REFRESH_DURATION_PARAM = 'account_entries_report_extension_base.refresh_duration'
+PARTITIONED_PARAM = 'account_entries_report_extension_base.partitioned'
+FINGERPRINT_PARAM = 'account_entries_report_extension_base.fingerprint'
+MATERIALIZED_TABLE = 'account_entries_report_materialized'
+
+# What the incremental refresh cannot tell from write_date is logged here by triggers, see
+# _materialized_log_triggers(): the ids of deleted and unreconciled move lines, null for a change to a dimension, and 0
+# for a sweep of the whole table.
+MATERIALIZED_LOG = 'account_entries_report_materialized_log'
+LOG_LINE_FUNCTION = 'account_entries_report_log_line'
+LOG_DIMENSION_FUNCTION = 'account_entries_report_log_dimension'
+
+# The scheduled actions refreshing the precomputed report data, see request_refresh().
+REFRESH_CRONS = [
+    'account_entries_report_extension_base.ir_cron_refresh_materialized',
+    'account_entries_report_extension_base.ir_cron_refresh_summary',
+]
+
+# Schema in which the materialized table is rebuilt from scratch, out of the way of the one being read.
+BUILD_SCHEMA = 'account_entries_report_build'
+
+# Transaction level advisory lock held while refreshing, so that refreshes started while one is running give way.
+REFRESH_LOCK = zlib.crc32(MATERIALIZED_TABLE.encode('ascii')) & 0x7fffffff
+
+
+SQL_LITERAL = re.compile(r"('(?:[^']|'')*')")
+SQL_PUNCTUATION_SPACE = re.compile(r"\s*([(),=<>!*+-])\s*")
+
+
+def normalize_sql(sql):
+    """Return sql with case and layout differences outside of string literals ironed out.
+    """
+    parts = SQL_LITERAL.split(tools.ustr(sql))
+    for index in range(0, len(parts), 2):
+        code = ' '.join(parts[index].lower().split())
+        parts[index] = SQL_PUNCTUATION_SPACE.sub(r'\1', code)
+    return ''.join(parts).strip()
+
+
+def sql_fingerprint(*parts):
+    """Return a digest identifying the given pieces of SQL, insensitive to case and layout.
+    """
+    normalized = '\n'.join(normalize_sql(part) for part in parts)
+    return 'sha1:' + hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+
+def view_fingerprint(cr, relname):
+    """Return the fingerprint stored with set_view_fingerprint() on a relation, or None if it does not exist.
+    """
+    cr.execute("select obj_description(oid, 'pg_class') from pg_class where relname = %s", (relname,))
+    row = cr.fetchone()
+    return row and row[0]
+
+
+def set_view_fingerprint(cr, kind, relname, fingerprint):
+    """Store a fingerprint as the comment of a relation, kind being 'view', 'materialized view' or 'table'.
+    """
+    cr.execute("comment on {kind} {relname} is %s".format(kind=kind, relname=relname), (fingerprint,))
+
+
+def drop_materialized_log(cr):
+    """Drop the log of changes of the materialized report, and the triggers filling it.
+    """
+    for function in (LOG_LINE_FUNCTION, LOG_DIMENSION_FUNCTION):
+        cr.execute("drop function if exists {function}() cascade".format(function=function))
+    cr.execute("drop table if exists {log}".format(log=MATERIALIZED_LOG))
+
+
+def plain_view_definition(report):
+    """Return the statement creating the plain account_entries_report view of core Odoo, which the columns and joins
+    of this module reproduce, without those of extensions, for report an account.entries.report instance.
+    """
+    select = ',\n'.join(
+        '                {expression} as {alias}'.format(expression=expression, alias=alias)
+        for alias, expression in AccountEntriesReport._view_definition_columns(report).items()
+    )
+    return """
+            create or replace view account_entries_report as (
+            select {select}
+            from
+                {from_}
+                where l.state != 'draft'
+            )
+    """.format(
+        select=select,
+        from_='\n                '.join(['account_move_line l'] + AccountEntriesReport._view_definition_joins(report)),
+    )
+
 
 class AccountEntriesReport(models.Model):
     _inherit = 'account.entries.report'
 
+    # Move lines written by transactions that were still open when a refresh started carry a write_date older than
+    # the refresh timestamp, so each incremental refresh looks back this many seconds further than strictly needed.
+    _materialized_refresh_overlap = 300
+
+    # Context keys read_group() reads, core's version of it included, which cached results are only shared across when
+    # they match.  What the current period and fiscal year filters ('period', 'year') depend on besides, such as the
+    # date, company and time zone, is covered by keying the results on the domain they narrow down to.
+    _read_group_cache_context = ('lang', 'tz', 'active_test', 'period', 'year')
+
     def init(self, cr):
-        tools.drop_view_if_exists(cr, 'account_entries_report')
-        cr.execute(self._view_definition())
+        if self._is_materialized(cr):
+            indexes.drop_indexes(cr, [index[0] for index in indexes.REPORT_INDEXES])
+        else:
+            indexes.ensure_indexes(cr, indexes.REPORT_INDEXES)
+        cache.ensure_generation_table(cr)
+        cache.bump_generation(cr)
+        fingerprint = self._view_fingerprint(cr)
+        params = self.pool['ir.config_parameter']
+        if fingerprint == params.get_param(cr, SUPERUSER_ID, FINGERPRINT_PARAM):
+            # The fingerprint is also kept as the comment of the view, which goes when core's own init() replaces the
+            # view with its own, as it does whenever the account module is updated.
+            if fingerprint == view_fingerprint(cr, 'account_entries_report'):
+                _logger.info('account_entries_report is up to date, leaving it alone')
+                return
+            if self._is_materialized(cr) and self._materialized_table_exists(cr):
+                _logger.info('Pointing account_entries_report at %s again', MATERIALIZED_TABLE)
+                self._create_materialized_view(cr)
+                self._set_fingerprint(cr, fingerprint)
+                return
+        started = time.time()
+        if self._is_materialized(cr):
+            # Builds the new table out of the way, and only swaps it in under the view at the end.
+            self._init_materialized(cr)
+        else:
+            cr.execute("drop table if exists {table} cascade".format(table=MATERIALIZED_TABLE))
+            drop_materialized_log(cr)
+            tools.drop_view_if_exists(cr, 'account_entries_report')
+            cr.execute(self._view_definition())
+        self._set_fingerprint(cr, fingerprint)
+        _logger.info('Rebuilt account_entries_report in %.2fs', time.time() - started)
+
+    def _set_fingerprint(self, cr, fingerprint):
+        self.pool['ir.config_parameter'].set_param(cr, SUPERUSER_ID, FINGERPRINT_PARAM, fingerprint)
+        set_view_fingerprint(cr, 'view', 'account_entries_report', fingerprint)
+
+    def _view_fingerprint(self, cr):
+        """Return a digest of everything that shapes the account_entries_report relation: the statement creating the
+        view in the view mode, which extensions may override, and the query the table is filled from otherwise.
+        """
+        if self._is_partitioned(cr):
+            return sql_fingerprint('partitioned', self._view_query())
+        if self._is_materialized(cr):
+            return sql_fingerprint('materialized', self._view_query())
+        return sql_fingerprint('view', self._view_definition())
+
+    def _is_materialized(self, cr):
+        """Return True if the report has been switched to the materialized mode.
+
+        The mode is opt-in, via the system parameter named in MATERIALIZED_PARAM, and takes effect at the next update of
+        this module (or the next scheduled refresh).
+        """
+        value = self.pool['ir.config_parameter'].get_param(cr, SUPERUSER_ID, MATERIALIZED_PARAM, 'False')
+        return value.strip().lower() in ('1', 'true', 'yes')
+
+    def _is_partitioned(self, cr):
+        """Return True if the materialized report rows are split into a table per company and fiscal year.
+
+        Opt-in on top of the materialized mode, via the system parameter named in PARTITIONED_PARAM.
+        """
+        if not self._is_materialized(cr):
+            return False
+        value = self.pool['ir.config_parameter'].get_param(cr, SUPERUSER_ID, PARTITIONED_PARAM, 'False')
+        return value.strip().lower() in ('1', 'true', 'yes')
+
+    def read_group(self, cr, uid, domain, fields, groupby, offset=0, limit=None, context=None, orderby=False,
+                   lazy=True):
+        key = None
+        if cache.ttl() > 0:
+            self.check_access_rights(cr, uid, 'read')
+            key = self._read_group_cache_key(cr, uid, domain, fields, groupby, offset=offset, limit=limit,
+                                             context=context, orderby=orderby, lazy=lazy)
+            result = cache.read_group_cache.get(key)
+            if result is not None:
+                return result
+        result = self._read_group_uncached(cr, uid, domain, fields, groupby, offset=offset, limit=limit,
+                                           context=context, orderby=orderby, lazy=lazy)
+        if key is not None:
+            cache.read_group_cache.put(key, result)
+        return result
+
+    def _read_group_cache_key(self, cr, uid, domain, fields, groupby, offset=0, limit=None, context=None,
+                              orderby=False, lazy=True):
+        """Return the key of a read_group in the result cache, see read_group_cache.py.
+
+        Users share results as long as they have the same company and record rules, and read them with the same
+        values of the context keys in _read_group_cache_context.
+        """
+        context = context or {}
+        user = self.pool['res.users'].browse(cr, SUPERUSER_ID, uid, context=context)
+        rules = self.pool['ir.rule']._compute_domain(cr, uid, self._name, 'read')
+        if isinstance(groupby, basestring):
+            groupby = [groupby]
+        return (
+            cr.dbname,
+            cache.current_generation(cr),
+            user.company_id.id,
+            cache.freeze(rules),
+            cache.freeze([context.get(name) for name in self._read_group_cache_context]),
+            cache.freeze(self._current_period_domain(cr, uid, domain, context=context)),
+            tuple(sorted(fields or [])),
+            tuple(groupby or []),
+            offset,
+            limit,
+            orderby or None,
+            lazy,
+        )
+
+    @api.model
+    def read_group_cache_statistics(self):
+        """Return the hits, misses, expired and evicted entries and size of the read_group cache of this process.
+        """
+        return cache.read_group_cache.statistics()
+
+    def fields_view_get(self, cr, uid, view_id=None, view_type='form', context=None, toolbar=False, submenu=False):
+        """Tell how fresh the analysis is in the title of its graph view, when it is read from precomputed data.
+        """
+        res = super(AccountEntriesReport, self).fields_view_get(
+            cr, uid, view_id=view_id, view_type=view_type, context=context, toolbar=toolbar, submenu=submenu,
+        )
+        if view_type == 'graph':
+            as_of = self._data_as_of(cr, uid, context=context)
+            if as_of:
+                arch = etree.fromstring(res['arch'])
+                arch.set('string', _('%s (data as of %s)') % (arch.get('string') or self._description, as_of))
+                res['arch'] = etree.tostring(arch, encoding='utf-8')
+        return res
+
+    @api.model
+    def _data_as_of(self):
+        """Return when the oldest of the precomputed data every read of the report comes from was refreshed, in the
+        user's time zone, or None if some are answered from the journal items.
+
+        That is only so in the materialized mode: otherwise grouped reads the summary doesn't cover are live, and the
+        view can't tell which of its reads are.
+        """
+        cr = self.env.cr
+        if not self._is_materialized(cr):
+            return None
+        timestamps = [
+            self.env['ir.config_parameter'].sudo().get_param(LAST_REFRESH_PARAM),
+            self.env['account.entries.report.summary']._last_refresh(),
+        ]
+        timestamps = [timestamp for timestamp in timestamps if timestamp]
+        if not timestamps:
+            return None
+        oldest = fields.Datetime.from_string(min(timestamps)[:19])
+        return fields.Datetime.context_timestamp(self, oldest).strftime('%Y-%m-%d %H:%M')
+
+    def _read_group_uncached(self, cr, uid, domain, fields, groupby, offset=0, limit=None, context=None,
+                             orderby=False, lazy=True):
+        summary = self.pool['account.entries.report.summary']
+        if summary._covers(cr, domain, fields, groupby, orderby=orderby) \
+                and summary.check_access_rights(cr, uid, 'read', raise_exception=False):
+            read_group = self._read_group_from_summary
+        else:
+            read_group = super(AccountEntriesReport, self).read_group
+        # Analytical reads go to the replica, if one is configured, see replica.py.
+        return call_with_replica(cr, lambda cursor: read_group(
+            cursor, uid, domain, fields, groupby, offset=offset, limit=limit, context=context, orderby=orderby,
+            lazy=lazy,
+        ))
+
+    @api.model
+    def search_read(self, domain=None, fields=None, offset=0, limit=None, order=None):
+        return call_with_replica(self.env.cr, lambda cursor: super(AccountEntriesReport, self.with_env(
+            self.env(cr=cursor),
+        )).search_read(domain=domain, fields=fields, offset=offset, limit=limit, order=order))
+
+    def _read_group_from_summary(self, cr, uid, domain, fields, groupby, offset=0, limit=None, context=None,
+                                 orderby=False, lazy=True):
+        """Answer a read_group from account.entries.report.summary, as if it had been run on the line level report.
+
+        Group counts are taken from the summed nbr column, since each summary row stands for many journal items.
+        """
+        domain = self._current_period_domain(cr, uid, domain, context=context)
+        summary_fields = list(fields or [])
+        if 'nbr' not in summary_fields:
+            summary_fields.append('nbr')
+        result = self.pool['account.entries.report.summary'].read_group(
+            cr, uid, domain, summary_fields, groupby, offset=offset, limit=limit, context=context, orderby=orderby,
+            lazy=lazy,
+        )
+        if groupby and lazy:
+            count_key = '%s_count' % groupby[0].split(':')[0]
+        else:
+            count_key = '__count'
+        for group in result:
+            if count_key in group:
+                group[count_key] = group.get('nbr') or 0
+            if 'nbr' not in (fields or []):
+                group.pop('nbr', None)
+        return result
+
+    def _current_period_domain(self, cr, uid, domain, context=None):
+        """Return domain narrowed down to the current period or fiscal year, as core read_group() does when the context
+        asks for it, as the 'current period' and 'current year' filters of the report's search view do.
+        """
+        context = context or {}
+        domain = list(domain or [])
+        if context.get('period') == 'current_period':
+            current_period = self.pool['account.period'].find(cr, uid, context=context)[0]
+            domain.append(['period_id', 'in', [current_period]])
+        elif context.get('year') == 'current_year':
+            fiscalyear_obj = self.pool['account.fiscalyear']
+            current_year = fiscalyear_obj.find(cr, uid)
+            period_ids = fiscalyear_obj.read(cr, uid, [current_year], ['period_ids'])[0]['period_ids']
+            domain.append(['period_id', 'in', period_ids])
+        return domain
+
+    @api.model
+    def _export_field_names(self, field_names=None):
+        """Validate the names of the report columns to export, defaulting to all of them in view order.
+        """
+        columns = [name for name in self._view_definition_columns() if name != 'id' and name in self._fields]
+        if not field_names:
+            return columns
+        unknown = [name for name in field_names if name not in columns]
+        if unknown:
+            raise Warning(_('Cannot export unknown columns: %s') % ', '.join(unknown))
+        return list(field_names)
+
+    @api.model
+    def _iter_export_rows(self, domain, field_names, batch_size=5000):
+        """Return an iterator over the printable values of field_names for each row of the report matching domain, as
+        lists, see account_extras_database/export.py.  Access rights and record rules apply.
+        """
+        self.check_access_rights('read')
+        query = self._where_calc(domain)
+        self._apply_ir_rules(query, 'read')
+        from_clause, where_clause, where_params = query.get_sql()
+        sql = """
+            select {columns}
+            from {from_clause}
+            where {where_clause}
+            order by "{table}".id
+        """.format(
+            columns=', '.join('"%s"."%s"' % (self._table, name) for name in field_names),
+            from_clause=from_clause,
+            where_clause=where_clause or 'true',
+            table=self._table,
+        )
+        return export.iter_printable_rows(
+            self.env, sql, where_params, [self._fields[name] for name in field_names], batch_size=batch_size,
+            cursor_name='account_entries_report_export',
+        )
 
     def _view_definition(self):
-        select_part = self._view_definition_select()
         view_definition = """
             create or replace view account_entries_report as (
+            {query}
+            )
+        """.format(query=self._view_query())
+        return view_definition
+
+    def _view_query(self):
+        """Return the query behind the report, without the view creation around it.
+
+        The query is composed from the columns and joins contributed by all installed extensions once, the first time
+        it is needed after the registry has been (re)loaded, and then reused.
+        """
+        # The model class is rebuilt on every registry load, so a cache kept on the class itself cannot go stale.
+        cls = type(self)
+        if '_view_query_cache' not in cls.__dict__:
+            cls._view_query_cache = """
             select {select}
             from
-                account_move_line l
-                left join account_account a on (l.account_id = a.id)
-                left join account_move am on (am.id=l.move_id)
-                left join account_period p on (am.period_id=p.id)
+                {from_}
                 where l.state != 'draft'
-            )
-        """.format(select=self._view_definition_select())
-        return view_definition
+            """.format(select=self._view_definition_select(), from_=self._view_definition_from())
+        return cls._view_query_cache
+
+    def _view_definition_columns(self):
+        """Return an OrderedDict mapping each column alias of the view to its SQL expression.
+
+        This is the preferred extension point: call this version with super() and add (or replace) entries.  Tables
+        the expressions need can be joined in through _view_definition_joins().
+        """
+        # If core Odoo's version changes, update these to suit.
+        return OrderedDict([
+            ('id', 'l.id'),
+            ('date', 'am.date'),
+            ('date_maturity', 'l.date_maturity'),
+            ('date_created', 'l.date_created'),
+            ('ref', 'am.ref'),
+            ('move_state', 'am.state'),
+            ('move_line_state', 'l.state'),
+            ('reconcile_id', 'l.reconcile_id'),
+            ('partner_id', 'l.partner_id'),
+            ('product_id', 'l.product_id'),
+            ('product_uom_id', 'l.product_uom_id'),
+            ('company_id', 'am.company_id'),
+            ('journal_id', 'am.journal_id'),
+            ('fiscalyear_id', 'p.fiscalyear_id'),
+            ('period_id', 'am.period_id'),
+            ('account_id', 'l.account_id'),
+            ('analytic_account_id', 'l.analytic_account_id'),
+            ('type', 'a.type'),
+            ('user_type', 'a.user_type'),
+            ('nbr', '1'),
+            ('quantity', 'l.quantity'),
+            ('currency_id', 'l.currency_id'),
+            ('amount_currency', 'l.amount_currency'),
+            ('debit', 'l.debit'),
+            ('credit', 'l.credit'),
+            ('balance', 'coalesce(l.debit, 0.0) - coalesce(l.credit, 0.0)'),
+        ])
+
+    def _view_definition_joins(self):
+        """Return the list of join clauses applied to account_move_line (aliased l) in the view.
+
+        Extensions call this version with super() and append their own.  A join contributed by several extensions is
+        only applied once.
+        """
+        return [
+            'left join account_account a on (l.account_id = a.id)',
+            'left join account_move am on (am.id=l.move_id)',
+            'left join account_period p on (am.period_id=p.id)',
+        ]
+
+    def _view_definition_from(self):
+        """Return the "FROM" part of the view definition query, with duplicate joins removed.
+        """
+        joins = []
+        seen = set()
+        for join in self._view_definition_joins():
+            key = ' '.join(join.lower().split())
+            if key not in seen:
+                seen.add(key)
+                joins.append(join)
+        return '\n                '.join(['account_move_line l'] + joins)
 
     def _view_definition_select(self):
         """Return all the stuff that comes inside the "SELECT" part of the view definition query.
 
-        Typically an extension will call this version with super(), and then append a comma followed by more column
-        definitions.
-        """
-        # If core Odoo's version changes, update upstream_part to suit.
-        upstream_part = """
-                l.id as id,
-                am.date as date,
-                l.date_maturity as date_maturity,
-                l.date_created as date_created,
-                am.ref as ref,
-                am.state as move_state,
-                l.state as move_line_state,
-                l.reconcile_id as reconcile_id,
-                l.partner_id as partner_id,
-                l.product_id as product_id,
-                l.product_uom_id as product_uom_id,
-                am.company_id as company_id,
-                am.journal_id as journal_id,
-                p.fiscalyear_id as fiscalyear_id,
-                am.period_id as period_id,
-                l.account_id as account_id,
-                l.analytic_account_id as analytic_account_id,
-                a.type as type,
-                a.user_type as user_type,
-                1 as nbr,
-                l.quantity as quantity,
-                l.currency_id as currency_id,
-                l.amount_currency as amount_currency,
-                l.debit as debit,
-                l.credit as credit,
-                coalesce(l.debit, 0.0) - coalesce(l.credit, 0.0) as balance"""
-        return upstream_part
-        
+        Built from _view_definition_columns().  Older extensions call this version with super(), and then append a
+        comma followed by more column definitions, which still works.
+        """
+        return ',\n'.join(
+            '                {expression} as {alias}'.format(expression=expression, alias=alias)
+            for alias, expression in self._view_definition_columns().items()
+        )
+
+    def _init_materialized(self, cr):
+        """(Re)build the table holding the report rows, and point the account_entries_report view at it.
+
+        The new table, and its partitions, are built in BUILD_SCHEMA while the current ones go on serving the report,
+        and only swapped in at the very end, so that reads of the report wait for no more than the swap.
+        """
+        cr.execute("select now() at time zone 'UTC'")
+        started = cr.fetchone()[0]
+        # The new table covers all that was logged so far.
+        cr.execute("create table if not exists {log} (line_id integer)".format(log=MATERIALIZED_LOG))
+        cr.execute("delete from {log}".format(log=MATERIALIZED_LOG))
+        cr.execute("select current_schema()")
+        schema = cr.fetchone()[0]
+        cr.execute("show search_path")
+        search_path = cr.fetchone()[0]
+        cr.execute("drop schema if exists {build} cascade".format(build=BUILD_SCHEMA))
+        cr.execute("create schema {build}".format(build=BUILD_SCHEMA))
+        # Unqualified tables are now created in the build schema, and still looked up in the usual schemas.
+        cr.execute("set local search_path to {build}, {search_path}".format(
+            build=BUILD_SCHEMA, search_path=search_path,
+        ))
+        if self._is_partitioned(cr):
+            # The rows all go to the partitions, which the table itself is only the parent of.
+            cr.execute("create table {table} as ({query}) with no data".format(
+                table=MATERIALIZED_TABLE, query=self._view_query(),
+            ))
+            self._index_materialized(cr, MATERIALIZED_TABLE)
+            self._load_materialized(cr)
+        else:
+            cr.execute("create table {table} as ({query})".format(table=MATERIALIZED_TABLE, query=self._view_query()))
+            self._index_materialized(cr, MATERIALIZED_TABLE)
+        cr.execute("set local search_path to {search_path}".format(search_path=search_path))
+
+        tools.drop_view_if_exists(cr, 'account_entries_report')
+        cr.execute("drop table if exists {table} cascade".format(table=MATERIALIZED_TABLE))
+        cr.execute("""
+            select c.relname
+            from pg_class c
+                join pg_namespace n on (n.oid=c.relnamespace)
+            where n.nspname = %s and c.relkind = 'r'
+        """, (BUILD_SCHEMA,))
+        for relname, in cr.fetchall():
+            cr.execute("alter table {build}.{table} set schema {schema}".format(
+                build=BUILD_SCHEMA, table=relname, schema=schema,
+            ))
+        cr.execute("drop schema {build}".format(build=BUILD_SCHEMA))
+        self._create_materialized_view(cr)
+        # Triggers are only (re)created now, as doing so holds up writes to their table until the transaction ends.
+        if self._install_materialized_log_triggers(cr):
+            # Lines deleted by transactions committed after this one started, but before the triggers are in place, are
+            # in the new table and not in the log; have the next refresh sweep the table for them.
+            cr.execute("insert into {log} (line_id) values (0)".format(log=MATERIALIZED_LOG))
+        indexes.ensure_indexes(cr, indexes.REFRESH_INDEXES)
+        self._set_last_refresh(cr, started)
+
+    def _materialized_dimensions(self):
+        """Return the tables other than account_move_line and account_move the report takes columns from, as an
+        OrderedDict mapping each to the list of those columns.
+
+        The rows of the materialized report are derived again when their move line or move is written, but a change to
+        any of these columns has the next refresh rebuild the whole table.  Extensions joining more tables in through
+        _view_definition_joins() add them here.
+        """
+        return OrderedDict([
+            ('account_account', ['type', 'user_type']),
+            ('account_period', ['fiscalyear_id']),
+        ])
+
+    def _materialized_log_triggers(self):
+        """Return the statements creating the triggers that fill MATERIALIZED_LOG, as (name, table, statement).
+
+        Deleted lines, and lines unreconciled by the deletion of their reconciliation, leave no trace in any write_date.
+        """
+        triggers = [
+            ('account_entries_report_log_delete', 'account_move_line', 'after delete', None, LOG_LINE_FUNCTION),
+            (
+                'account_entries_report_log_unreconcile', 'account_move_line', 'after update of reconcile_id',
+                'old.reconcile_id is not null and new.reconcile_id is null', LOG_LINE_FUNCTION,
+            ),
+        ]
+        for table, columns in self._materialized_dimensions().items():
+            triggers.append((
+                'account_entries_report_log_{table}'.format(table=table), table,
+                'after update of {columns}'.format(columns=', '.join(columns)),
+                ' or '.join('old.{0} is distinct from new.{0}'.format(column) for column in columns),
+                LOG_DIMENSION_FUNCTION,
+            ))
+        statement = "create trigger {name} {event} on {table} for each row {when} execute procedure {function}()"
+        return [
+            (name, table, statement.format(
+                name=name, event=event, table=table, when='when ({0})'.format(when) if when else '', function=function,
+            ))
+            for name, table, event, when, function in triggers
+        ]
+
+    def _install_materialized_log_triggers(self, cr):
+        """Bring the triggers of _materialized_log_triggers() up to date, and return True if any was (re)created.
+
+        Each trigger carries the fingerprint of its statement as its comment, so that unchanged ones are left alone.
+        """
+        cr.execute("""
+            create or replace function {function}() returns trigger as $$
+            begin
+                insert into {log} (line_id) values (old.id);
+                return null;
+            end
+            $$ language plpgsql
+        """.format(function=LOG_LINE_FUNCTION, log=MATERIALIZED_LOG))
+        cr.execute("""
+            create or replace function {function}() returns trigger as $$
+            begin
+                insert into {log} (line_id) values (null);
+                return null;
+            end
+            $$ language plpgsql
+        """.format(function=LOG_DIMENSION_FUNCTION, log=MATERIALIZED_LOG))
+        cr.execute("""
+            select t.tgname, c.relname, obj_description(t.oid, 'pg_trigger')
+            from pg_trigger t
+                join pg_class c on (c.oid=t.tgrelid)
+                join pg_proc p on (p.oid=t.tgfoid)
+            where p.proname in %s
+        """, ((LOG_LINE_FUNCTION, LOG_DIMENSION_FUNCTION),))
+        existing = dict(((name, table), comment) for name, table, comment in cr.fetchall())
+        wanted = dict(
+            ((name, table), sql_fingerprint(statement)) for name, table, statement in self._materialized_log_triggers()
+        )
+        for (name, table), fingerprint in existing.items():
+            if wanted.get((name, table)) != fingerprint:
+                cr.execute("drop trigger {name} on {table}".format(name=name, table=table))
+        created = False
+        for name, table, statement in self._materialized_log_triggers():
+            fingerprint = wanted[(name, table)]
+            if existing.get((name, table)) != fingerprint:
+                cr.execute(statement)
+                cr.execute("comment on trigger {name} on {table} is %s".format(name=name, table=table), (fingerprint,))
+                created = True
+        return created
+
+    def _create_materialized_view(self, cr):
+        tools.drop_view_if_exists(cr, 'account_entries_report')
+        cr.execute("""
+            create or replace view account_entries_report as (
+            select * from {table}
+            )
+        """.format(table=MATERIALIZED_TABLE))
+
+    def _materialized_table_exists(self, cr):
+        cr.execute("select 1 from pg_class where relname = %s and relkind = 'r'", (MATERIALIZED_TABLE,))
+        return bool(cr.fetchone())
+
+    def _index_materialized(self, cr, table):
+        cr.execute("alter table {table} add primary key (id)".format(table=table))
+        cr.execute("""
+            create index {table}_analysis_index
+            on {table} (company_id, period_id, account_id, partner_id)
+        """.format(table=table))
+
+    def _load_materialized(self, cr, where=''):
+        """Insert the report rows matching the where clause (on the alias r) into the materialized table, and return
+        how many there were.
+
+        When partitioned, the rows are first gathered in a temporary table, then inserted into the partition of their
+        company and fiscal year, which is created, and indexed once filled, if it doesn't exist yet.
+        """
+        if not self._is_partitioned(cr):
+            cr.execute("insert into {table} select * from ({query}) r {where}".format(
+                table=MATERIALIZED_TABLE, query=self._view_query(), where=where,
+            ))
+            return cr.rowcount
+        cr.execute("drop table if exists account_entries_report_new")
+        cr.execute("""
+            create temporary table account_entries_report_new on commit drop as
+            select * from ({query}) r {where}
+        """.format(query=self._view_query(), where=where))
+        cr.execute("select distinct company_id, fiscalyear_id from account_entries_report_new")
+        count = 0
+        for company_id, fiscalyear_id in cr.fetchall():
+            partition, constraint = self._materialized_partition(company_id, fiscalyear_id)
+            cr.execute("""
+                select 1
+                from pg_class c
+                    join pg_namespace n on (n.oid=c.relnamespace)
+                where c.relname = %s and c.relkind = 'r' and n.nspname = current_schema()
+            """, (partition,))
+            exists = cr.fetchone()
+            if not exists:
+                cr.execute("create table {partition} (check ({constraint})) inherits ({table})".format(
+                    partition=partition, constraint=constraint, table=MATERIALIZED_TABLE,
+                ))
+            cr.execute("insert into {partition} select * from account_entries_report_new where {constraint}".format(
+                partition=partition, constraint=constraint,
+            ))
+            count += cr.rowcount
+            if not exists:
+                _logger.info('Created %s with %d rows', partition, cr.rowcount)
+                self._index_materialized(cr, partition)
+        return count
+
+    def _materialized_partition(self, company_id, fiscalyear_id):
+        """Return the name of the partition for the rows of a company and fiscal year, and its check constraint.
+
+        The constraints let PostgreSQL leave out the partitions of other companies and fiscal years when the report is
+        filtered on company_id or fiscalyear_id, as the UI does.
+        """
+        name = '{table}_c{company}_fy{fiscalyear}'.format(
+            table=MATERIALIZED_TABLE, company=company_id or 'none', fiscalyear=fiscalyear_id or 'none',
+        )
+        constraint = ' and '.join(
+            '{0} = {1:d}'.format(column, value) if value else '{0} is null'.format(column)
+            for column, value in (('company_id', company_id), ('fiscalyear_id', fiscalyear_id))
+        )
+        return name, constraint
+
+    @api.model
+    def explain_report_queries(self):
+        """Show which indexes PostgreSQL would use for the typical queries of the report.
+
+        The queries filter on a period, a date range, an account type and a partner, with values taken from the most
+        recent move line, and sum the measures, as the pivot view does.  They are EXPLAINed, not run.  Return a
+        dictionary of the indexes used by each query, and the indexes of indexes.REPORT_INDEXES used by none, and log
+        it.
+        """
+        cr = self.env.cr
+        cr.execute("""
+            select am.period_id, am.date, a.user_type, l.partner_id
+            from account_move_line l
+                join account_move am on (am.id=l.move_id)
+                join account_account a on (a.id=l.account_id)
+            where l.state != 'draft'
+            order by l.id desc
+            limit 1
+        """)
+        sample = cr.fetchone()
+        if not sample:
+            return {}
+        period_id, date, user_type, partner_id = sample
+        queries = [
+            ('period', "period_id = %s group by account_id", (period_id,)),
+            ('date', "date between %s::date - 30 and %s group by account_id", (date, date)),
+            ('user_type', "user_type = %s group by period_id", (user_type,)),
+            ('partner', "partner_id = %s group by account_id", (partner_id,)),
+        ]
+        used = {}
+        for name, condition, params in queries:
+            cr.execute("""
+                explain (format json)
+                select sum(debit), sum(credit), sum(balance)
+                from account_entries_report
+                where """ + condition, params)
+            plan = cr.fetchone()[0]
+            if isinstance(plan, basestring):
+                plan = json.loads(plan)
+            used[name] = sorted(set(self._plan_index_names(plan[0]['Plan'])))
+            _logger.info('Report query on %s uses %s', name, ', '.join(used[name]) or 'no index')
+        unused = sorted(
+            index for index, table, columns, include, where in indexes.REPORT_INDEXES
+            if not any(index in names for names in used.values())
+        )
+        if unused:
+            _logger.info('Unused report indexes: %s', ', '.join(unused))
+        return {'queries': used, 'unused': unused}
+
+    def _plan_index_names(self, node):
+        if node.get('Index Name'):
+            yield node['Index Name']
+        for child in node.get('Plans', []):
+            for name in self._plan_index_names(child):
+                yield name
+
+    def _set_last_refresh(self, cr, timestamp):
+        self.pool['ir.config_parameter'].set_param(cr, SUPERUSER_ID, LAST_REFRESH_PARAM, str(timestamp))
+
+    @api.model
+    def refresh_materialized(self):
+        """Bring the materialized report rows up to date.
+
+        Only the rows of move lines created, changed or deleted since the previous refresh are derived again, so this
+        is cheap enough to be run frequently by the scheduler.  Changes to the accounts and periods behind the rows,
+        see _materialized_dimensions(), have the whole table rebuilt.  Readers of the report are never held up: rows are
+        replaced within the refresh's transaction, and a full rebuild is swapped in when done.  Does nothing unless the
+        materialized mode is enabled, or while another refresh is running.
+        """
+        cr = self.env.cr
+        if not self._is_materialized(cr):
+            return False
+        cr.execute("select pg_try_advisory_xact_lock(%s)", (REFRESH_LOCK,))
+        if not cr.fetchone()[0]:
+            _logger.info('%s is already being refreshed', MATERIALIZED_TABLE)
+            return False
+        started = time.time()
+        self._refresh_materialized()
+        cache.bump_generation(cr)
+        self.env['ir.config_parameter'].sudo().set_param(REFRESH_DURATION_PARAM, '%.3f' % (time.time() - started))
+        return True
+
+    def _refresh_materialized(self):
+        cr = self.env.cr
+        last_refresh = self.env['ir.config_parameter'].sudo().get_param(LAST_REFRESH_PARAM)
+        cr.execute("select count(*) from pg_class where relname in %s and relkind = 'r'", (
+            (MATERIALIZED_TABLE, MATERIALIZED_LOG),
+        ))
+        if not last_refresh or cr.fetchone()[0] < 2:
+            self._rebuild_materialized()
+            return
+
+        cr.execute("select now() at time zone 'UTC'")
+        started = cr.fetchone()[0]
+        cr.execute("drop table if exists account_entries_report_changed")
+        cr.execute("create temporary table account_entries_report_changed (id integer) on commit drop")
+        # Only what is logged by transactions committed so far is taken, and so removed from the log.
+        cr.execute("""
+            with logged as (delete from {log} returning line_id)
+            insert into account_entries_report_changed select line_id from logged
+        """.format(log=MATERIALIZED_LOG))
+        cr.execute("select id from account_entries_report_changed where id is null or id = 0")
+        logged = set(line_id for line_id, in cr.fetchall())
+        if None in logged:
+            _logger.info('A dimension of %s changed, rebuilding it', MATERIALIZED_TABLE)
+            self._rebuild_materialized()
+            return
+        if 0 in logged:
+            cr.execute("""
+                insert into account_entries_report_changed
+                select m.id
+                from {table} m
+                    left join account_move_reconcile r on (r.id=m.reconcile_id)
+                where m.reconcile_id is not null and r.id is null
+                union
+                select m.id
+                from {table} m
+                    left join account_move_line l on (l.id=m.id)
+                where l.id is null
+            """.format(table=MATERIALIZED_TABLE))
+        # Moves are posted and cancelled through plain SQL, see account_move.py for how their write_date is kept honest.
+        cr.execute("""
+            insert into account_entries_report_changed
+            select l.id
+            from account_move_line l
+            where l.write_date >= %(since)s::timestamp - %(overlap)s * interval '1 second'
+            union
+            select l.id
+            from account_move_line l
+                join account_move am on (am.id=l.move_id)
+            where am.write_date >= %(since)s::timestamp - %(overlap)s * interval '1 second'
+        """, {
+            'since': last_refresh,
+            'overlap': self._materialized_refresh_overlap,
+        })
+        cr.execute("""
+            delete from {table}
+            where id in (select id from account_entries_report_changed)
+        """.format(table=MATERIALIZED_TABLE))
+        count = self._load_materialized(cr, "where r.id in (select id from account_entries_report_changed)")
+        _logger.debug('Refreshed %d rows of %s', count, MATERIALIZED_TABLE)
+        self._set_last_refresh(cr, started)
+
+    def _rebuild_materialized(self):
+        cr = self.env.cr
+        self._init_materialized(cr)
+        self._set_fingerprint(cr, self._view_fingerprint(cr))
+
+    @api.model
+    def request_refresh(self):
+        """Have the scheduled refreshes of the precomputed report data run as soon as the scheduler gets to them.
+
+        The refreshes themselves run in the background; a refresh already running is left alone.
+        """
+        self.check_access_rights('read')
+        cr = self.env.cr
+        for xml_id in REFRESH_CRONS:
+            cron = self.env.ref(xml_id, raise_if_not_found=False)
+            if not cron:
+                continue
+            try:
+                with cr.savepoint():
+                    cr.execute(
+                        "select id from ir_cron where id = %s for update nowait", (cron.id,), log_exceptions=False,
+                    )
+                    cr.execute("update ir_cron set nextcall = now() at time zone 'UTC' where id = %s", (cron.id,))
+            except psycopg2.OperationalError:
+                # Locked by the scheduler, which is running it right now.
+                continue
+        return True
 
 # vim:expandtab:smartindent:tabstop=4:softtabstop=4:shiftwidth=4:
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#
+# Extensible Account Entries Analysis Report
+# Copyright (C) 2016 OpusVL (<http://opusvl.com/>)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+##############################################################################
+
+import datetime
+import logging
+
+from openerp import models, fields, api
+from openerp.exceptions import Warning
+from openerp.tools.translate import _
+
+from openerp.addons.account_extras_database.replica import call_with_replica
+
+_logger = logging.getLogger(__name__)
+
+try:
+    import numpy
+except ImportError:
+    _logger.debug('Cannot import numpy, aging and running balances of the Entries Analysis will not be available')
+    numpy = None
+
+# Upper bounds, in days overdue, of the aging buckets; anything older goes in a last, open ended bucket.
+DEFAULT_AGING_BUCKETS = (30, 60, 90, 120)
+
+EPOCH = datetime.date(1970, 1, 1)
+
+
+class AccountEntriesReport(models.Model):
+    _inherit = 'account.entries.report'
+
+    @api.model
+    def aging_by_partner(self, domain=None, as_of=None, buckets=DEFAULT_AGING_BUCKETS):
+        """Return the open balance of each partner split by how overdue it is on as_of (today by default).
+
+        Takes the unreconciled rows matching domain (the receivable ones by default), due at their maturity date, or
+        their date if they have none.  The result maps each partner id (False for rows without one) to a dictionary
+        of the balance per bucket label ('not_due', '1-30', ..., '+120' with the default buckets) and 'total'.
+        """
+        if domain is None:
+            domain = [('type', '=', 'receivable')]
+        as_of = fields.Date.from_string(as_of or fields.Date.context_today(self))
+        buckets = sorted(buckets)
+        if not buckets or buckets[0] <= 0 or len(set(buckets)) != len(buckets):
+            raise Warning(_('Aging buckets must be one or more distinct, positive numbers of days.'))
+        labels = ['not_due'] + [
+            '%d-%d' % (low + 1, high) for low, high in zip([0] + buckets[:-1], buckets)
+        ] + ['+%d' % buckets[-1]]
+        columns = self._fetch_columns(domain, [
+            'coalesce("{table}".date_maturity, "{table}".date) - date \'1970-01-01\'',
+            'coalesce("{table}".partner_id, 0)',
+            '"{table}".balance',
+            'coalesce("{table}".reconcile_id, 0)',
+        ])
+        maturity, partner_ids, balances, reconcile_ids = columns
+        open_items = reconcile_ids == 0
+        if not open_items.any():
+            return {}
+        days_overdue = (as_of - EPOCH).days - maturity[open_items]
+        balances = balances[open_items]
+        # 0 for not due yet, i for at most buckets[i - 1] days overdue, len(buckets) + 1 for older.
+        bucket_index = numpy.searchsorted(numpy.array([0] + buckets), days_overdue, side='left')
+        partners, partner_index = numpy.unique(partner_ids[open_items], return_inverse=True)
+        totals = numpy.bincount(
+            partner_index * len(labels) + bucket_index,
+            weights=balances,
+            minlength=len(partners) * len(labels),
+        ).reshape(len(partners), len(labels))
+        result = {}
+        for partner_id, amounts in zip(partners.tolist(), totals.tolist()):
+            values = dict(zip(labels, amounts))
+            values['total'] = sum(amounts)
+            result[int(partner_id) or False] = values
+        return result
+
+    @api.model
+    def running_balances(self, domain=None):
+        """Return the balance of each partner after each row matching domain, in order of date.
+
+        The result has the lists 'ids', 'partner_ids' (False for rows without a partner), 'dates' and 'balances', one
+        item per row, sorted by partner, then date.
+        """
+        columns = self._fetch_columns(domain or [], [
+            '"{table}".id',
+            'coalesce("{table}".partner_id, 0)',
+            '"{table}".date - date \'1970-01-01\'',
+            '"{table}".balance',
+        ], order='coalesce("{table}".partner_id, 0), "{table}".date, "{table}".id')
+        ids, partner_ids, days, balances = columns
+        cumulative = numpy.cumsum(balances)
+        if len(ids):
+            # Take off what the partners before each row's partner add up to.
+            starts = numpy.concatenate(([0], numpy.flatnonzero(numpy.diff(partner_ids)) + 1))
+            counts = numpy.diff(numpy.concatenate((starts, [len(ids)])))
+            cumulative -= numpy.repeat(cumulative[starts] - balances[starts], counts)
+        dates = numpy.datetime64(EPOCH.isoformat(), 'D') + days.astype(int).astype('timedelta64[D]')
+        return {
+            'ids': ids.astype(int).tolist(),
+            'partner_ids': [int(partner_id) or False for partner_id in partner_ids.tolist()],
+            'dates': [str(date) for date in dates],
+            'balances': cumulative.tolist(),
+        }
+
+    @api.model
+    def _fetch_columns(self, domain, expressions, order=None):
+        """Return one numpy array per SQL expression (on the report table, as {table}), of the rows matching domain.
+
+        The rows are fetched with a single query, from the replica if one is configured.  Access rights and record
+        rules apply.  Expressions must not be NULL.
+        """
+        if numpy is None:
+            raise Warning(_('The numpy Python module is needed to compute aging and running balances.'))
+        self.check_access_rights('read')
+        query = self._where_calc(domain)
+        self._apply_ir_rules(query, 'read')
+        from_clause, where_clause, where_params = query.get_sql()
+        sql = """
+            select {columns}
+            from {from_clause}
+            where {where_clause}
+            {order}
+        """.format(
+            columns=', '.join(expression.format(table=self._table) for expression in expressions),
+            from_clause=from_clause,
+            where_clause=where_clause or 'true',
+            order='order by ' + order.format(table=self._table) if order else '',
+        )
+
+        def fetch(cursor):
+            cursor.execute(sql, where_params)
+            return cursor.fetchall()
+        rows = call_with_replica(self.env.cr, fetch)
+        data = numpy.array(rows, dtype=float).reshape(len(rows), len(expressions))
+        return [data[:, index] for index in range(len(expressions))]
+
+# vim:expandtab:smartindent:tabstop=4:softtabstop=4:shiftwidth=4:
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#
+# Extensible Account Entries Analysis Report
+# Copyright (C) 2016 OpusVL (<http://opusvl.com/>)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+##############################################################################
+
+import logging
+import time
+import zlib
+
+from openerp import SUPERUSER_ID
+from openerp import models, fields, api
+
+from .. import read_group_cache as cache
+from .account_entries_report import sql_fingerprint, view_fingerprint, set_view_fingerprint
+
+_logger = logging.getLogger(__name__)
+
+SUMMARY_PARAM = 'account_entries_report_extension_base.summary'
+SUMMARY_LAST_REFRESH_PARAM = 'account_entries_report_extension_base.summary_last_refresh'
+SUMMARY_REFRESH_DURATION_PARAM = 'account_entries_report_extension_base.summary_refresh_duration'
+
+# Transaction level advisory lock held while refreshing, so that refreshes started while one is running give way.
+SUMMARY_REFRESH_LOCK = zlib.crc32(b'account_entries_report_summary') & 0x7fffffff
+
+
+class AccountEntriesReportSummary(models.Model):
+    """Entries Analysis pre-aggregated per company, period, account, partner, journal and move status.
+
+    The rows come from the same query as account.entries.report, extensions included, so the totals always match the
+    line level report as of the last refresh.  account.entries.report routes its read_group here when the requested
+    fields, groupbys and domain are all covered by this model.
+    """
+    _name = 'account.entries.report.summary'
+    _description = 'Journal Items Analysis Summary'
+    _auto = False
+    _rec_name = 'period_id'
+
+    # The dimensions of the summary.  Each must be a column of account.entries.report with the same meaning.
+    _summary_dimensions = (
+        'company_id',
+        'period_id',
+        'fiscalyear_id',
+        'account_id',
+        'partner_id',
+        'journal_id',
+        'move_state',
+    )
+    # Summable columns of account.entries.report kept in the summary.
+    _summary_measures = (
+        'nbr',
+        'debit',
+        'credit',
+        'balance',
+    )
+
+    company_id = fields.Many2one(comodel_name='res.company', string='Company', readonly=True)
+    period_id = fields.Many2one(comodel_name='account.period', string='Period', readonly=True)
+    fiscalyear_id = fields.Many2one(comodel_name='account.fiscalyear', string='Fiscal Year', readonly=True)
+    account_id = fields.Many2one(comodel_name='account.account', string='Account', readonly=True)
+    partner_id = fields.Many2one(comodel_name='res.partner', string='Partner', readonly=True)
+    journal_id = fields.Many2one(comodel_name='account.journal', string='Journal', readonly=True)
+    move_state = fields.Selection(
+        selection=[('draft', 'Unposted'), ('posted', 'Posted')],
+        string='Status',
+        readonly=True,
+    )
+    nbr = fields.Integer(string='# of Items', readonly=True)
+    debit = fields.Float(string='Debit', readonly=True)
+    credit = fields.Float(string='Credit', readonly=True)
+    balance = fields.Float(string='Balance', readonly=True)
+
+    def init(self, cr):
+        view_definition = self._view_definition(populate=self._is_enabled(cr))
+        fingerprint = sql_fingerprint(view_definition)
+        if fingerprint == view_fingerprint(cr, 'account_entries_report_summary'):
+            _logger.info('account_entries_report_summary is up to date, leaving it alone')
+            return
+        started = time.time()
+        cr.execute("drop materialized view if exists account_entries_report_summary")
+        cr.execute(view_definition)
+        cr.execute("create unique index account_entries_report_summary_id_index on account_entries_report_summary (id)")
+        if self._is_enabled(cr):
+            cr.execute("select now() at time zone 'UTC'")
+            self.pool['ir.config_parameter'].set_param(
+                cr, SUPERUSER_ID, SUMMARY_LAST_REFRESH_PARAM, str(cr.fetchone()[0]),
+            )
+        set_view_fingerprint(cr, 'materialized view', 'account_entries_report_summary', fingerprint)
+        _logger.info('Rebuilt account_entries_report_summary in %.2fs', time.time() - started)
+
+    def _is_enabled(self, cr):
+        """Return True if the summary is to be populated and used by account.entries.report.
+
+        Opt-in, via the system parameter named in SUMMARY_PARAM.
+        """
+        value = self.pool['ir.config_parameter'].get_param(cr, SUPERUSER_ID, SUMMARY_PARAM, 'False')
+        return value.strip().lower() in ('1', 'true', 'yes')
+
+    def _view_definition(self, populate=True):
+        dimensions = ', '.join('r.%s' % dimension for dimension in self._summary_dimensions)
+        # min(r.id) is stable for a given set of lines, which keeps ids meaningful across refreshes.
+        return """
+            create materialized view account_entries_report_summary as (
+            select
+                min(r.id) as id,
+                {dimensions},
+                {measures}
+            from ({query}) r
+            group by {dimensions}
+            ) with {data}
+        """.format(
+            dimensions=dimensions,
+            measures=', '.join('sum(r.{0}) as {0}'.format(measure) for measure in self._summary_measures),
+            query=self.pool['account.entries.report']._view_query(),
+            data='data' if populate else 'no data',
+        )
+
+    @api.model
+    def refresh_summary(self):
+        """Recompute the summary from the current journal items.
+
+        Once the summary has been populated, it is refreshed concurrently, which leaves it readable throughout.  Does
+        nothing unless the summary is enabled, or while another refresh is running.
+        """
+        cr = self.env.cr
+        if not self._is_enabled(cr):
+            return False
+        cr.execute("select pg_try_advisory_xact_lock(%s)", (SUMMARY_REFRESH_LOCK,))
+        if not cr.fetchone()[0]:
+            _logger.info('account_entries_report_summary is already being refreshed')
+            return False
+        cr.execute("select now() at time zone 'UTC'")
+        refreshed_at = cr.fetchone()[0]
+        started = time.time()
+        # Concurrent refreshes need PostgreSQL 9.4, and a populated view with a unique index, which init() makes.
+        if self._is_populated(cr) and cr._cnx.server_version >= 90400:
+            cr.execute("refresh materialized view concurrently account_entries_report_summary")
+        else:
+            cr.execute("refresh materialized view account_entries_report_summary")
+        cache.bump_generation(cr)
+        params = self.env['ir.config_parameter'].sudo()
+        params.set_param(SUMMARY_LAST_REFRESH_PARAM, str(refreshed_at))
+        params.set_param(SUMMARY_REFRESH_DURATION_PARAM, '%.3f' % (time.time() - started))
+        return True
+
+    def _is_populated(self, cr):
+        """Return True if the summary has been computed, which it isn't until the first update or refresh after it
+        has been enabled.
+        """
+        cr.execute("select relispopulated from pg_class where relname = 'account_entries_report_summary'")
+        row = cr.fetchone()
+        return bool(row and row[0])
+
+    def _covers(self, cr, domain, field_names, groupby, orderby=False):
+        """Return True if a read_group on account.entries.report with these arguments can be answered from the summary.
+
+        The 'current period' and 'current year' filters of the report are passed in the context rather than the domain,
+        see AccountEntriesReport._current_period_domain(), and narrow the domain on period_id, which is covered.
+        Whether the summary is in use is only checked for the read_groups it could answer, see _is_available().
+        """
+        dimensions = set(self._summary_dimensions)
+        for spec in groupby or []:
+            # Date granularities such as 'date:month' are never covered, as no date is kept.
+            if spec not in dimensions:
+                return False
+        for name in field_names or []:
+            if name not in dimensions and name not in self._summary_measures:
+                return False
+        for leaf in domain or []:
+            if not isinstance(leaf, (list, tuple)) or not isinstance(leaf[0], basestring):
+                continue
+            if leaf[0].split('.')[0] not in dimensions:
+                return False
+        for term in (orderby or '').split(','):
+            name = term.strip().split(' ')[0]
+            if name and name not in dimensions and name not in self._summary_measures:
+                return False
+        return self._is_available(cr)
+
+    def _is_available(self, cr):
+        """Return True if the summary is enabled and populated.
+
+        Enabling the summary takes a module update, which reloads the registry, so whether it is enabled is only read
+        once per registry load, as is whether it is populated once it is.
+        """
+        # The model class is rebuilt on every registry load, so what is kept on the class itself cannot go stale.
+        cls = type(self)
+        if '_enabled_cache' not in cls.__dict__:
+            cls._enabled_cache = self._is_enabled(cr)
+        if not cls._enabled_cache:
+            return False
+        if not cls.__dict__.get('_populated_cache'):
+            cls._populated_cache = self._is_populated(cr)
+        return cls._populated_cache
+
+    @api.model
+    def _last_refresh(self):
+        """Return when the summary reads are answered from was last refreshed, in UTC, or None if it isn't available.
+        """
+        if not self._is_available(self.env.cr):
+            return None
+        return self.env['ir.config_parameter'].sudo().get_param(SUMMARY_LAST_REFRESH_PARAM)
+
+# vim:expandtab:smartindent:tabstop=4:softtabstop=4:shiftwidth=4:
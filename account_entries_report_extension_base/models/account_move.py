@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#
+# Extensible Account Entries Analysis Report
+# Copyright (C) 2016 OpusVL (<http://opusvl.com/>)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+##############################################################################
+
+from openerp import models, fields, api
+
+from .. import read_group_cache as cache
+
+
+class AccountMove(models.Model):
+    _inherit = 'account.move'
+
+    @api.multi
+    def post(self):
+        res = super(AccountMove, self).post()
+        self._touch_write_date()
+        cache.bump_generation(self.env.cr)
+        return res
+
+    @api.multi
+    def button_cancel(self):
+        res = super(AccountMove, self).button_cancel()
+        self._touch_write_date()
+        cache.bump_generation(self.env.cr)
+        return res
+
+    @api.multi
+    def _touch_write_date(self):
+        """Core posts and cancels moves with a plain SQL update of their state, which leaves write_date alone.
+
+        The materialized entries report relies on write_date to find what changed, so bump it here.
+        """
+        if self.ids:
+            self.env.cr.execute("""
+                update account_move
+                set write_date = (now() at time zone 'UTC')
+                where id in %s
+            """, (tuple(self.ids),))
+            self.invalidate_cache(['write_date'])
+
+# vim:expandtab:smartindent:tabstop=4:softtabstop=4:shiftwidth=4:
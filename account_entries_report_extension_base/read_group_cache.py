@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#
+# Extensible Account Entries Analysis Report
+# Copyright (C) 2016 OpusVL (<http://opusvl.com/>)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+##############################################################################
+
+"""An in-process cache of the results of read_group on the Entries Analysis.
+
+Off unless the server configuration file gives the results a lifetime::
+
+    ; seconds a result may be served from the cache, 0 to disable it
+    account_entries_report_cache_ttl = 60
+    ; results kept, the least recently used ones are dropped first
+    account_entries_report_cache_size = 256
+
+Results are keyed on the database's report generation, bumped whenever moves are posted or cancelled and whenever the
+precomputed report data is refreshed, so those invalidate the cache of every server process at once.  Other changes to
+journal items show up once the cached results expire.
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from openerp import tools
+
+# Each bump inserts a row numbered from GENERATION_SEQUENCE into GENERATION_TABLE, and the generation is the highest
+# number in the table: rows only show once the transaction that bumped commits, and those of transactions rolled back
+# are never seen, nor their numbers used again.
+GENERATION_SEQUENCE = 'account_entries_report_generation_seq'
+GENERATION_TABLE = 'account_entries_report_generation'
+
+# Bumps between trims of GENERATION_TABLE down to its last row.
+GENERATION_TRIM_INTERVAL = 1000
+
+
+def ttl():
+    return float(tools.config.get('account_entries_report_cache_ttl', 0) or 0)
+
+
+def max_size():
+    return int(tools.config.get('account_entries_report_cache_size', 256) or 0)
+
+
+def ensure_generation_table(cr):
+    cr.execute("select 1 from pg_class where relname = %s and relkind = 'S'", (GENERATION_SEQUENCE,))
+    if not cr.fetchone():
+        cr.execute("create sequence {sequence}".format(sequence=GENERATION_SEQUENCE))
+    cr.execute("create table if not exists {table} (id integer primary key)".format(table=GENERATION_TABLE))
+
+
+def drop_generation_table(cr):
+    cr.execute("drop table if exists {table}".format(table=GENERATION_TABLE))
+    cr.execute("drop sequence if exists {sequence}".format(sequence=GENERATION_SEQUENCE))
+
+
+def current_generation(cr):
+    cr.execute("select coalesce(max(id), 0) from {table}".format(table=GENERATION_TABLE))
+    return cr.fetchone()[0]
+
+
+def bump_generation(cr):
+    """Invalidate the cached results of the database of cr, in every server process, once the transaction of cr commits.
+
+    Results computed before then by other transactions are cached under the current generation, which they are still
+    right for.  Does nothing when the cache is disabled.
+    """
+    if ttl() <= 0:
+        return
+    cr.execute("insert into {table} (id) values (nextval(%s)) returning id".format(table=GENERATION_TABLE),
+               (GENERATION_SEQUENCE,))
+    generation = cr.fetchone()[0]
+    if generation % GENERATION_TRIM_INTERVAL == 0:
+        cr.execute("delete from {table} where id < %s".format(table=GENERATION_TABLE), (generation,))
+
+
+class ResultCache(object):
+    """A least recently used cache whose entries expire after a while, safe to share between threads.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = dict.fromkeys(['hits', 'misses', 'expired', 'evicted'], 0)
+
+    def get(self, key):
+        """Return a copy of the result cached under key, or None.
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            stored, result = entry
+            if time.time() - stored > ttl():
+                self.stats['expired'] += 1
+                self.stats['misses'] += 1
+                return None
+            self._entries[key] = entry
+            self.stats['hits'] += 1
+        return copy.deepcopy(result)
+
+    def put(self, key, result):
+        entry = (time.time(), copy.deepcopy(result))
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = entry
+            while len(self._entries) > max_size():
+                self._entries.popitem(last=False)
+                self.stats['evicted'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def statistics(self):
+        with self._lock:
+            stats = dict(self.stats, size=len(self._entries))
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = float(stats['hits']) / lookups if lookups else 0.0
+        return stats
+
+
+# The cache of this server process, for all databases.
+read_group_cache = ResultCache()
+
+
+def freeze(value):
+    """Return value, a domain or other structure of lists, tuples and dictionaries, as a hashable equivalent.
+    """
+    if isinstance(value, dict):
+        return tuple(sorted((key, freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, set):
+        return tuple(sorted(freeze(item) for item in value))
+    return value
+
+# vim:expandtab:smartindent:tabstop=4:softtabstop=4:shiftwidth=4:
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#
+# Account extras database helpers
+# Copyright (C) 2017 OpusVL (<http://opusvl.com/>)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+##############################################################################
+
+
+{
+    'name': 'Account extras database helpers',
+    'version': '0.1',
+    'author': 'OpusVL',
+    'website': 'http://opusvl.com/',
+    'summary': 'Database helpers shared by the account extras modules',
+    
+    'category': 'Technical',
+    
+    'description': """Database helpers shared by the account extras modules,
+
+Has no tables of its own.  ``indexes.py`` builds the indexes the other modules
+want on the tables of core Odoo: straight away on small tables, and otherwise
+with ``scripts/build_indexes.py`` once the module update is done, which builds
+them concurrently without blocking writes::
+
+    python scripts/build_indexes.py -c odoo.conf -d dbname
+
+``replica.py`` routes reads to the read replica named by
+``account_entries_report_replica`` in the server configuration file, see
+``account_entries_report_extension_base``.
+
+``account.extras.invoice.backfill`` is the base of the wizards linking existing
+invoices to their source documents, which have the scheduler work through the
+invoices in batches, each committed on its own.
+""",
+    'images': [
+    ],
+    'depends': [
+        'base',
+    ],
+    'data': [
+    ],
+    'demo': [
+    ],
+    'test': [
+    ],
+    'license': 'AGPL-3',
+    'installable': True,
+    'auto_install': False,
+
+}
+
+# vim:expandtab:smartindent:tabstop=4:softtabstop=4:shiftwidth=4:
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#
+# Account extras database helpers
+# Copyright (C) 2017 OpusVL (<http://opusvl.com/>)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+##############################################################################
+
+"""Streaming of query results as printable rows, for exports of any size.
+"""
+
+
+def iter_printable_rows(env, query, params, fields, batch_size=2000, cursor_name='account_extras_export'):
+    """Yield the rows of query, run with params on the cursor of env, as lists of printable values.
+
+    fields are the fields the columns hold, or None for columns printed as they are: many2ones are printed as the
+    display names of the records, and selections as their labels.  Rows are fetched from a server side cursor
+    batch_size at a time, and the display names looked up per batch, so memory use does not depend on the number of
+    rows.
+    """
+    many2ones = []
+    selections = []
+    for index, field in enumerate(fields):
+        if field is None:
+            continue
+        if field.type == 'many2one':
+            many2ones.append((index, env[field.comodel_name].sudo()))
+        elif field.type == 'selection':
+            selections.append((index, dict(field._description_selection(env))))
+    # A named cursor keeps the result on the server, to be fetched a batch at a time.
+    cursor = env.cr._cnx.cursor(cursor_name)
+    try:
+        cursor.execute(query, params)
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            # Look up the display names of each relation for the whole batch at once.
+            names = {}
+            for index, comodel in many2ones:
+                ids = list(set(row[index] for row in batch if row[index]))
+                names[index] = dict(comodel.browse(ids).name_get()) if ids else {}
+            for row in batch:
+                row = list(row)
+                for index, comodel in many2ones:
+                    row[index] = names[index].get(row[index])
+                for index, labels in selections:
+                    row[index] = labels.get(row[index], row[index])
+                yield row
+            env.invalidate_all()
+    finally:
+        cursor.close()
+
+# vim:expandtab:smartindent:tabstop=4:softtabstop=4:shiftwidth=4:
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#
+# Account extras database helpers
+# Copyright (C) 2017 OpusVL (<http://opusvl.com/>)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+##############################################################################
+
+"""Indexes the account extras modules keep on the tables of core Odoo.
+
+A plain CREATE INDEX holds up every write to the table for as long as the build takes, which on the ledger of a large
+database is far too long to do in a module update.  So the indexes are only built straight away on small tables, and
+otherwise left to scripts/build_indexes.py, to be run once the update is done::
+
+    python scripts/build_indexes.py -c odoo.conf -d dbname
+
+which builds them with CREATE INDEX CONCURRENTLY.  That cannot run inside a transaction, nor alongside one holding an
+older snapshot, such as that of the module update or of a scheduled action, hence the separate step.
+
+Modules describe their indexes as (name, table, key columns, included columns, condition), and have an indexes.py of
+their own whose build_indexes(cr) the script calls.
+"""
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Tables with up to this many rows (as estimated by PostgreSQL) are indexed in the module update itself.
+SMALL_TABLE_ROWS = 100000
+
+
+def index_state(cr, name):
+    """Return True if the index exists and is valid, False if it exists but is not, and None if it doesn't exist.
+
+    An interrupted concurrent build leaves an invalid index behind, which is maintained but never used.
+    """
+    cr.execute("""
+        select i.indisvalid
+        from pg_index i
+            join pg_class c on (c.oid=i.indexrelid)
+        where c.relname = %s
+    """, (name,))
+    row = cr.fetchone()
+    return row[0] if row else None
+
+
+def create_index(cr, name, table, columns, include=None, where=None, concurrently=False):
+    """Create an index unless a valid one of that name exists, and return True if it was created.
+
+    Included columns need PostgreSQL 11; before that they are appended to the key columns instead, which serves the
+    same queries with a somewhat larger index.  cr must be in autocommit mode to build the index concurrently.
+    """
+    state = index_state(cr, name)
+    if state:
+        return False
+    concurrently = 'concurrently ' if concurrently else ''
+    if state is False:
+        cr.execute("drop index {concurrently}{name}".format(concurrently=concurrently, name=name))
+    if include and cr._cnx.server_version < 110000:
+        columns, include = '{0}, {1}'.format(columns, include), None
+    cr.execute("create index {concurrently}{name} on {table} ({columns}){include}{where}".format(
+        concurrently=concurrently, name=name, table=table, columns=columns,
+        include=' include ({0})'.format(include) if include else '',
+        where=' where {0}'.format(where) if where else '',
+    ))
+    _logger.info('Created index %s', name)
+    return True
+
+
+def drop_indexes(cr, names):
+    """Drop the indexes of the given names that exist.
+    """
+    for name in names:
+        if index_state(cr, name) is not None:
+            cr.execute("drop index {name}".format(name=name))
+            _logger.info('Dropped index %s', name)
+
+
+def ensure_indexes(cr, indexes):
+    """Create those of indexes that are missing on small tables, and tell how to build those on larger ones.
+    """
+    missing = []
+    for name, table, columns, include, where in indexes:
+        if index_state(cr, name):
+            continue
+        cr.execute("select reltuples from pg_class where relname = %s and relkind = 'r'", (table,))
+        row = cr.fetchone()
+        if row and row[0] > SMALL_TABLE_ROWS:
+            missing.append(name)
+        else:
+            create_index(cr, name, table, columns, include=include, where=where)
+    if missing:
+        _logger.warning('Indexes %s are missing, build them with scripts/build_indexes.py', ', '.join(missing))
+
+
+def build_indexes(cr, indexes):
+    """Build those of indexes that are missing concurrently, on cr, a cursor in autocommit mode.
+    """
+    for name, table, columns, include, where in indexes:
+        create_index(cr, name, table, columns, include=include, where=where, concurrently=True)
+
+# vim:expandtab:smartindent:tabstop=4:softtabstop=4:shiftwidth=4:
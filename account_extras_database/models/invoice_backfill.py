@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#
+# Account extras database helpers
+# Copyright (C) 2017 OpusVL (<http://opusvl.com/>)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+##############################################################################
+
+import logging
+import time
+from contextlib import closing
+
+from openerp import tools
+from openerp import models, fields, api
+from openerp.exceptions import AccessError, ValidationError, Warning
+from openerp.tools.translate import _
+
+_logger = logging.getLogger(__name__)
+
+
+class InvoiceBackfill(models.AbstractModel):
+    """Base of the wizards filling in the link from invoices created before a module was installed to their source.
+
+    The invoices are worked through in batches of ids, each committed on its own, by the scheduler rather than in the
+    request of the wizard, and a run resumes after the last batch done.  Models inheriting this one name the system
+    parameter keeping their progress and the model of the source documents, and implement _backfill_batch().
+    """
+    _name = 'account.extras.invoice.backfill'
+    _description = 'Link existing invoices to their source document'
+
+    # The system parameter keeping the id of the last invoice processed.
+    _backfill_last_id_param = None
+    # The model of the source documents, whose stored invoice totals are recomputed once invoices are linked to them.
+    _backfill_source_model = None
+
+    batch_size = fields.Integer(
+        string='Invoices per batch',
+        required=True,
+        default=10000,
+        help='Each batch of invoices is committed on its own, so the backfill can run while the database is in use.',
+    )
+
+    restart = fields.Boolean(
+        string='Start from the first invoice',
+        help='Otherwise carry on after the last invoice processed by a previous run.',
+    )
+
+    @api.constrains('batch_size')
+    def _check_batch_size(self):
+        if any(wizard.batch_size <= 0 for wizard in self):
+            raise ValidationError(_('The number of invoices per batch must be positive.'))
+
+    @api.multi
+    def action_backfill(self):
+        for wizard in self:
+            self._schedule_backfill(wizard.batch_size, restart=wizard.restart)
+        return {'type': 'ir.actions.act_window_close'}
+
+    def _check_backfill_access(self):
+        """The backfill updates every invoice in SQL, committing as it goes, so it is kept to administrators.
+        """
+        if not self.env.user.has_group('base.group_system'):
+            raise AccessError(_('Only administrators may link existing invoices to their source documents.'))
+
+    @api.model
+    def _schedule_backfill(self, batch_size, restart=False):
+        """Have the scheduler run the backfill in the background as soon as it gets to it, rather than in the request
+        of the wizard, which the time limits of the server would cut short on a large database.
+        """
+        self._check_backfill_access()
+        crons = self.env['ir.cron'].sudo()
+        # Earlier runs, which the scheduler deactivates once done.
+        crons.with_context(active_test=False).search([
+            ('model', '=', self._name),
+            ('function', '=', '_cron_backfill'),
+            ('active', '=', False),
+        ]).unlink()
+        crons.create({
+            'name': self._description,
+            'user_id': self.env.uid,
+            'model': self._name,
+            'function': '_cron_backfill',
+            'args': repr((batch_size, restart)),
+            'interval_number': 1,
+            'interval_type': 'minutes',
+            'numbercall': 1,
+            'nextcall': fields.Datetime.now(),
+            'doall': True,
+        })
+
+    @api.model
+    def _cron_backfill(self, batch_size, restart=False):
+        """Backfill for as long as a worker may run, and schedule another run to carry on if that wasn't enough.
+        """
+        self.backfill(batch_size=batch_size, restart=restart, max_seconds=self._backfill_run_seconds())
+        last_id = int(self.env['ir.config_parameter'].sudo().get_param(self._backfill_last_id_param) or 0)
+        self.env.cr.execute("select coalesce(max(id), 0) from account_invoice")
+        if last_id < self.env.cr.fetchone()[0]:
+            self._schedule_backfill(batch_size)
+        return True
+
+    def _backfill_run_seconds(self):
+        """Return how long a scheduled run of the backfill may go on, well within the time limits of the workers.
+        """
+        limits = [tools.config.get(key) for key in ('limit_time_cpu', 'limit_time_real')]
+        limits = [limit for limit in limits if limit and limit > 0]
+        return min(limits) / 2.0 if limits else 60.0
+
+    @api.model
+    def backfill(self, batch_size=10000, restart=False, max_seconds=None):
+        """Link the invoices to their source documents, see _backfill_batch(), batch by batch of invoice ids.
+
+        Progress is committed, and logged, after every batch, so an interrupted run carries on where it stopped when
+        called again.  With max_seconds, stops after the first batch that ends later than that.  Return the number of
+        invoices linked.
+        """
+        self._check_backfill_access()
+        if batch_size <= 0:
+            raise Warning(_('The number of invoices per batch must be positive.'))
+        started = time.time()
+        linked = 0
+        with closing(self.pool.cursor()) as cr:
+            env = api.Environment(cr, self.env.uid, self.env.context)
+            params = env['ir.config_parameter'].sudo()
+            last_id = 0 if restart else int(params.get_param(self._backfill_last_id_param) or 0)
+            cr.execute("select coalesce(max(id), 0) from account_invoice")
+            max_id = cr.fetchone()[0]
+            self._backfill_prepare(cr)
+            while last_id < max_id:
+                upper_id = last_id + batch_size
+                source_ids = self._backfill_batch(cr, last_id, upper_id)
+                linked += len(source_ids)
+                self._recompute_invoice_totals(env, source_ids)
+                last_id = upper_id
+                params.set_param(self._backfill_last_id_param, str(min(last_id, max_id)))
+                cr.commit()
+                _logger.info('%s: invoices up to id %d of %d done, %d linked so far',
+                             self._description, min(last_id, max_id), max_id, linked)
+                if max_seconds and time.time() - started >= max_seconds:
+                    break
+        return linked
+
+    def _backfill_prepare(self, cr):
+        """Prepare what the batches of a run share, on the cursor of the run.
+        """
+        pass
+
+    def _backfill_batch(self, cr, lower_id, upper_id):
+        """Link the invoices with lower_id < id <= upper_id, and return the ids of the documents they were linked to.
+        """
+        raise NotImplementedError()
+
+    def _recompute_invoice_totals(self, env, source_ids):
+        """The links were set in SQL, behind the ORM's back, so bring the stored invoice totals of the documents up to
+        date.
+        """
+        sources = env[self._backfill_source_model].browse(list(set(source_ids)))
+        if sources:
+            env.add_todo(sources._fields['created_invoice_count'], sources)
+            sources.recompute()
+            env.invalidate_all()
+
+# vim:expandtab:smartindent:tabstop=4:softtabstop=4:shiftwidth=4:
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#
+# Account extras instrumentation
+# Copyright (C) 2017 OpusVL (<http://opusvl.com/>)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+##############################################################################
+
+
+{
+    'name': 'Account extras instrumentation',
+    'version': '0.1',
+    'author': 'OpusVL',
+    'website': 'http://opusvl.com/',
+    'summary': 'Count and time the invoicing and Entries Analysis hooks of the account extras modules',
+    
+    'category': 'Technical',
+    
+    'description': """Count and time the invoicing and Entries Analysis hooks of the account extras modules,
+
+Records the calls, SQL queries and time spent in ``sale.order._prepare_invoice()``,
+``stock.picking._create_invoice_from_picking()`` and ``account.entries.report``'s
+``refresh_materialized()``, including every override of them in the modules this
+one depends on.
+
+Off unless enabled in the server configuration file::
+
+    account_extras_instrumentation = True
+    ; calls slower than this are logged as warnings, 0 to log none
+    account_extras_instrumentation_slow_ms = 500
+    ; needed to scrape the metrics over HTTP
+    account_extras_instrumentation_token = <secret>
+
+The figures are kept in memory by each server process, and are available in
+Prometheus text format from ``account.extras.instrumentation.prometheus_metrics()``
+(to administrators) and ``/account_extras_instrumentation/metrics?token=<secret>``.
+""",
+    'images': [
+    ],
+    'depends': [
+        'account_entries_report_extension_base',
+        'account_invoice_sale_link',
+        'account_invoice_stock_picking_link',
+        'account_invoice_delivery_address_sale',
+        'account_invoice_delivery_address_stock',
+    ],
+    'data': [
+    ],
+    'demo': [
+    ],
+    'test': [
+    ],
+    'license': 'AGPL-3',
+    'installable': True,
+    'auto_install': False,
+
+}
+
+# vim:expandtab:smartindent:tabstop=4:softtabstop=4:shiftwidth=4:
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#
+# Account extras instrumentation
+# Copyright (C) 2017 OpusVL (<http://opusvl.com/>)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+##############################################################################
+
+import hmac
+
+from werkzeug.exceptions import NotFound
+
+from openerp import http, tools
+from openerp.http import request
+
+from ..models import metrics
+
+
+class InstrumentationMetrics(http.Controller):
+
+    @http.route('/account_extras_instrumentation/metrics', type='http', auth='none')
+    def metrics(self, token='', **kwargs):
+        """Serve the figures of this server process to Prometheus, to those who know the configured token.
+        """
+        expected = tools.config.get('account_extras_instrumentation_token')
+        if not expected or not hmac.compare_digest(tools.ustr(token).encode('utf-8'), tools.ustr(expected).encode('utf-8')):
+            raise NotFound()
+        return request.make_response(metrics.prometheus_text(), headers=[
+            ('Content-Type', 'text/plain; version=0.0.4'),
+        ])
+
+# vim:expandtab:smartindent:tabstop=4:softtabstop=4:shiftwidth=4:
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#
+# Account extras instrumentation
+# Copyright (C) 2017 OpusVL (<http://opusvl.com/>)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+##############################################################################
+
+from openerp import models, api
+
+from .metrics import measure
+
+
+class AccountEntriesReport(models.Model):
+    _inherit = 'account.entries.report'
+
+    @api.model
+    def refresh_materialized(self):
+        with measure(self.env.cr, 'account.entries.report.refresh_materialized'):
+            return super(AccountEntriesReport, self).refresh_materialized()
+
+# vim:expandtab:smartindent:tabstop=4:softtabstop=4:shiftwidth=4:
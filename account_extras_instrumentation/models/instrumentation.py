@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#
+# Account extras instrumentation
+# Copyright (C) 2017 OpusVL (<http://opusvl.com/>)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+##############################################################################
+
+from openerp import models, api
+from openerp.exceptions import AccessError
+from openerp.tools.translate import _
+
+from . import metrics
+
+
+class AccountExtrasInstrumentation(models.AbstractModel):
+    _name = 'account.extras.instrumentation'
+    _description = 'Account extras instrumentation'
+
+    def _check_figures_access(self):
+        """The figures are callable over RPC and tell about the use of the whole database, so they are kept to
+        administrators.
+        """
+        if not self.env.user.has_group('base.group_system'):
+            raise AccessError(_('Only administrators may read or reset the instrumentation figures.'))
+
+    @api.model
+    def prometheus_metrics(self):
+        """Return the figures recorded by this server process, in the Prometheus text format.
+        """
+        self._check_figures_access()
+        return metrics.prometheus_text()
+
+    @api.model
+    def hook_figures(self):
+        """Return the figures recorded by this server process, by hook name.
+        """
+        self._check_figures_access()
+        return metrics.snapshot()
+
+    @api.model
+    def reset_figures(self):
+        self._check_figures_access()
+        metrics.reset()
+        return True
+
+# vim:expandtab:smartindent:tabstop=4:softtabstop=4:shiftwidth=4:
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#
+# Account extras instrumentation
+# Copyright (C) 2017 OpusVL (<http://opusvl.com/>)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+##############################################################################
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from openerp import tools
+
+_logger = logging.getLogger(__name__)
+
+# The figures of each hook, by hook name, for this server process.
+_hooks = {}
+_lock = threading.Lock()
+
+METRICS = [
+    # (name, type, help, key of the figures of a hook)
+    ('account_extras_hook_calls_total', 'counter', 'Calls of the hook.', 'calls'),
+    ('account_extras_hook_queries_total', 'counter', 'SQL queries run by calls of the hook.', 'queries'),
+    ('account_extras_hook_seconds_total', 'counter', 'Time spent in calls of the hook.', 'seconds'),
+    ('account_extras_hook_slow_calls_total', 'counter', 'Calls of the hook slower than the threshold.', 'slow_calls'),
+    ('account_extras_hook_seconds_max', 'gauge', 'Longest call of the hook.', 'seconds_max'),
+]
+
+
+def enabled():
+    return tools.config.get('account_extras_instrumentation', False) in (True, 'True', 'true', '1')
+
+
+def slow_threshold():
+    """Return the duration above which a call is logged as slow, in seconds, or 0 to log none.
+    """
+    return float(tools.config.get('account_extras_instrumentation_slow_ms', 500) or 0) / 1000.0
+
+
+@contextmanager
+def measure(cr, hook):
+    """Record a call of hook, with the queries it runs on cr and how long it takes, when instrumentation is enabled.
+    """
+    if not enabled():
+        yield
+        return
+    queries = cr.sql_log_count
+    start = time.time()
+    try:
+        yield
+    finally:
+        record(hook, time.time() - start, cr.sql_log_count - queries)
+
+
+def record(hook, seconds, queries):
+    threshold = slow_threshold()
+    slow = bool(threshold) and seconds > threshold
+    with _lock:
+        figures = _hooks.setdefault(hook, dict.fromkeys(['calls', 'queries', 'seconds', 'slow_calls', 'seconds_max'], 0))
+        figures['calls'] += 1
+        figures['queries'] += queries
+        figures['seconds'] += seconds
+        figures['slow_calls'] += slow
+        figures['seconds_max'] = max(figures['seconds_max'], seconds)
+    if slow:
+        _logger.warning('%s took %.0f ms and %d queries', hook, seconds * 1000, queries)
+
+
+def snapshot():
+    """Return a copy of the figures of every hook called so far, by hook name.
+    """
+    with _lock:
+        return dict((hook, dict(figures)) for hook, figures in _hooks.items())
+
+
+def reset():
+    with _lock:
+        _hooks.clear()
+
+
+def prometheus_text():
+    """Return the figures of every hook in the Prometheus text exposition format.
+    """
+    hooks = snapshot()
+    lines = []
+    for name, metric_type, help_text, key in METRICS:
+        lines.append('# HELP %s %s' % (name, help_text))
+        lines.append('# TYPE %s %s' % (name, metric_type))
+        for hook in sorted(hooks):
+            lines.append('%s{hook="%s"} %s' % (name, hook, repr(float(hooks[hook][key]))))
+    return '\n'.join(lines) + '\n'
+
+# vim:expandtab:smartindent:tabstop=4:softtabstop=4:shiftwidth=4:
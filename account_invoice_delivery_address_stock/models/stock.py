@@ -27,7 +27,7 @@ class StockPicking(models.Model):
 
     @api.model
     def _create_invoice_from_picking(self, picking, vals):
-        vals = vals.copy()
+        # vals is built afresh by stock_account for every call, so it can be added to without a copy.
         if picking.picking_type_id.code == 'outgoing':
             vals['partner_shipping_id'] = picking.partner_id.id
         return super(StockPicking, self)._create_invoice_from_picking(picking, vals)
@@ -31,15 +31,23 @@
     'category': 'Accounting',
     
     'description': """Add a link to the originating Sales Order from an Invoice,
+
+On databases with many invoices, the index on the link isn't built by the
+module update, which would block writes to invoices for the whole build; run
+``scripts/build_indexes.py -c odoo.conf -d dbname`` afterwards to build it
+concurrently.
 """,
     'images': [
     ],
     'depends': [
         'account',
+        'account_extras_database',
         'sale',
     ],
     'data': [
         'views/account.xml',
+        'views/sale.xml',
+        'wizard/backfill_source_sale_order_view.xml',
     ],
     'demo': [
     ],
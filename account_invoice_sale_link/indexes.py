@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#
+# Link to sales order from invoice
+# Copyright (C) 2017 OpusVL (<http://opusvl.com/>)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+##############################################################################
+
+"""The index on account_invoice.source_sale_order_id, built as account_extras_database/indexes.py does.
+
+The field isn't indexed by the ORM, which would build the index inside the module update regardless of the size of
+account_invoice.
+"""
+
+from openerp.addons.account_extras_database import indexes
+
+# As (name, table, key columns, included columns, condition).
+INDEXES = [
+    ('account_invoice_source_sale_order_index', 'account_invoice', 'source_sale_order_id', None, None),
+]
+
+
+def ensure_indexes(cr):
+    indexes.ensure_indexes(cr, INDEXES)
+
+
+def build_indexes(cr):
+    """Build the index concurrently, on cr, a cursor in autocommit mode, for scripts/build_indexes.py.
+    """
+    indexes.build_indexes(cr, INDEXES)
+
+# vim:expandtab:smartindent:tabstop=4:softtabstop=4:shiftwidth=4:
@@ -20,7 +20,10 @@
 #
 ##############################################################################
 
+from collections import OrderedDict
+
 from openerp import models, fields, api
+import openerp.addons.decimal_precision as dp
 
 
 class SaleOrder(models.Model):
@@ -32,6 +35,33 @@ class SaleOrder(models.Model):
         readonly=True,
     )
 
+    created_invoice_count = fields.Integer(
+        string='# of Invoices',
+        compute='_compute_created_invoice_totals',
+        store=True,
+    )
+
+    created_invoice_amount_total = fields.Float(
+        string='Invoiced Total',
+        digits=dp.get_precision('Account'),
+        compute='_compute_created_invoice_totals',
+        store=True,
+    )
+
+
+    # What _prepare_invoice() and its overrides read from each order, loaded for a whole batch of orders at once by
+    # action_invoice_create_batch().  Extensions reading more can add to this.
+    _invoice_prefetch_paths = [
+        'partner_id',
+        'partner_invoice_id.property_account_receivable',
+        'partner_invoice_id.property_account_position',
+        'partner_shipping_id',
+        'payment_term',
+        'fiscal_position',
+        'pricelist_id.currency_id',
+        'company_id',
+        'user_id',
+    ]
 
     @api.model
     def _prepare_invoice(self, order, lines):
@@ -39,7 +69,74 @@ class SaleOrder(models.Model):
         res.update({'source_sale_order_id': order.id})
         return res
 
+    @api.multi
+    def action_invoice_create_batch(self, batch_size=500, grouped=False, states=None, date_invoice=False):
+        """Invoice a large number of orders, batch_size orders at a time, and return the ids of the invoices created.
+
+        Every order goes through the standard action_invoice_create(), and so through all _prepare_invoice()
+        overrides, but what those read is loaded for the whole batch up front, and stored computed fields are
+        recomputed once per batch rather than after every invoice.  The cache is emptied between batches, to keep
+        memory use flat however many orders there are.  The orders of each invoicing partner are kept in the same
+        batch, see _invoice_batches(), so the invoices are the same as those of a single action_invoice_create().
+        """
+        invoice_ids = []
+        for orders in self._invoice_batches(batch_size):
+            orders._prefetch_invoice_data()
+            existing = set(orders.mapped('invoice_ids').ids)
+            with self.env.norecompute():
+                orders.action_invoice_create(grouped=grouped, states=states, date_invoice=date_invoice)
+            self.recompute()
+            orders.invalidate_cache(['invoice_ids'])
+            invoice_ids.extend(sorted(set(orders.mapped('invoice_ids').ids) - existing))
+            self.invalidate_cache()
+        return invoice_ids
+
+    @api.multi
+    def _invoice_batches(self, batch_size):
+        """Split the orders into batches of about batch_size orders, never splitting those of an invoicing partner.
+
+        action_invoice_create() merges the invoices of the orders of the same invoicing partner when grouped, and
+        checks they share a currency, which batches must not undo.  A partner with more than batch_size orders gets
+        a batch of its own.
+        """
+        groups = OrderedDict()
+        for order in self:
+            groups.setdefault(order.partner_invoice_id.id or order.partner_id.id, []).append(order.id)
+        batches = [[]]
+        for order_ids in groups.values():
+            if batches[-1] and len(batches[-1]) + len(order_ids) > batch_size:
+                batches.append([])
+            batches[-1].extend(order_ids)
+        return [self.browse(order_ids) for order_ids in batches if order_ids]
+
+    @api.multi
+    def _prefetch_invoice_data(self):
+        for path in self._invoice_prefetch_paths:
+            self.mapped(path)
+
+    @api.multi
+    @api.depends('created_invoice_ids.state', 'created_invoice_ids.type', 'created_invoice_ids.amount_total')
+    def _compute_created_invoice_totals(self):
+        """Count and total the non-cancelled invoices of every order in self with a single grouped query.
 
+        Refunds count negatively towards the total.
+        """
+        order_ids = [order.id for order in self if not isinstance(order.id, models.NewId)]
+        totals = {}
+        if order_ids:
+            groups = self.env['account.invoice'].sudo().read_group(
+                [('source_sale_order_id', 'in', order_ids), ('state', '!=', 'cancel')],
+                ['source_sale_order_id', 'type', 'amount_total'],
+                ['source_sale_order_id', 'type'],
+                lazy=False,
+            )
+            for group in groups:
+                order_id = group['source_sale_order_id'][0]
+                count, amount = totals.get(order_id, (0, 0.0))
+                sign = -1 if group['type'] in ('out_refund', 'in_refund') else 1
+                totals[order_id] = (count + group['__count'], amount + sign * group['amount_total'])
+        for order in self:
+            order.created_invoice_count, order.created_invoice_amount_total = totals.get(order.id, (0, 0.0))
 
 
 # vim:expandtab:smartindent:tabstop=4:softtabstop=4:shiftwidth=4:
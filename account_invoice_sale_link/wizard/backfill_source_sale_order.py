@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#
+# Link to sales order from invoice
+# Copyright (C) 2017 OpusVL (<http://opusvl.com/>)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+##############################################################################
+
+from openerp import models
+
+LAST_ID_PARAM = 'account_invoice_sale_link.backfill_last_invoice_id'
+
+
+class BackfillSourceSaleOrder(models.TransientModel):
+    """Fill in source_sale_order_id on invoices created before this module was installed.
+    """
+    _name = 'account.invoice.backfill.sale.order'
+    _inherit = 'account.extras.invoice.backfill'
+    _description = 'Link existing invoices to their sales order'
+
+    _backfill_last_id_param = LAST_ID_PARAM
+    _backfill_source_model = 'sale.order'
+
+    def _backfill_batch(self, cr, lower_id, upper_id):
+        """Link the invoices with lower_id < id <= upper_id, and return the ids of the orders they were linked to.
+
+        An invoice is linked to the order it is attached to through sale_order_invoice_rel, provided it is attached to
+        no other; failing that, to the order of its company whose name is its origin.
+        """
+        cr.execute("""
+            update account_invoice ai
+            set source_sale_order_id = links.order_id
+            from (
+                select rel.invoice_id, min(rel.order_id) as order_id
+                from sale_order_invoice_rel rel
+                where rel.invoice_id > %(lower_id)s and rel.invoice_id <= %(upper_id)s
+                group by rel.invoice_id
+                having count(distinct rel.order_id) = 1
+            ) links
+            where ai.id = links.invoice_id
+                and ai.source_sale_order_id is null
+            returning ai.source_sale_order_id
+        """, {'lower_id': lower_id, 'upper_id': upper_id})
+        order_ids = [row[0] for row in cr.fetchall()]
+        cr.execute("""
+            update account_invoice ai
+            set source_sale_order_id = so.id
+            from sale_order so
+            where ai.id > %(lower_id)s and ai.id <= %(upper_id)s
+                and ai.source_sale_order_id is null
+                and ai.origin = so.name
+                and ai.company_id = so.company_id
+            returning ai.source_sale_order_id
+        """, {'lower_id': lower_id, 'upper_id': upper_id})
+        order_ids.extend(row[0] for row in cr.fetchall())
+        return order_ids
+
+# vim:expandtab:smartindent:tabstop=4:softtabstop=4:shiftwidth=4:
@@ -21,5 +21,6 @@
 ##############################################################################
 
 from . import models
+from . import wizard
 
 # vim:expandtab:smartindent:tabstop=4:softtabstop=4:shiftwidth=4:
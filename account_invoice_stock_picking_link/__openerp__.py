@@ -31,16 +31,24 @@
     'category': 'Accounting',
     
     'description': """Add a link to the originating Picking from an Invoice,
+
+On databases with many invoices, the index on the link isn't built by the
+module update, which would block writes to invoices for the whole build; run
+``scripts/build_indexes.py -c odoo.conf -d dbname`` afterwards to build it
+concurrently.
 """,
     'images': [
     ],
     'depends': [
         'account',
+        'account_extras_database',
         'stock',
         'sale_stock',
     ],
     'data': [
         'views/account.xml',
+        'views/stock.xml',
+        'wizard/backfill_source_stock_picking_view.xml',
     ],
     'demo': [
     ],
@@ -22,6 +22,8 @@
 
 from openerp import models, fields, api
 
+from .. import indexes
+
 class AccountInvoice(models.Model):
     _inherit = 'account.invoice'
 
@@ -31,4 +33,10 @@ class AccountInvoice(models.Model):
         readonly=True,
     )
 
+    def _auto_init(self, cr, context=None):
+        # source_stock_picking_id is indexed here rather than by the ORM, see indexes.py.
+        res = super(AccountInvoice, self)._auto_init(cr, context=context)
+        indexes.ensure_indexes(cr)
+        return res
+
 # vim:expandtab:smartindent:tabstop=4:softtabstop=4:shiftwidth=4:
@@ -21,6 +21,7 @@
 ##############################################################################
 
 from openerp import models, fields, api
+import openerp.addons.decimal_precision as dp
 
 class StockPicking(models.Model):
     _inherit = 'stock.picking'
@@ -31,10 +32,77 @@ class StockPicking(models.Model):
         readonly=True,
     )
 
+    created_invoice_count = fields.Integer(
+        string='# of Invoices',
+        compute='_compute_created_invoice_totals',
+        store=True,
+    )
+
+    created_invoice_amount_total = fields.Float(
+        string='Invoiced Total',
+        digits=dp.get_precision('Account'),
+        compute='_compute_created_invoice_totals',
+        store=True,
+    )
+
+    # What _create_invoice_from_picking() and its overrides read from each picking, loaded for a whole batch of
+    # pickings at once by action_invoice_create_batch().  Extensions reading more can add to this.
+    _invoice_prefetch_paths = [
+        'picking_type_id',
+        'partner_id',
+        'company_id',
+        'move_lines.product_id',
+        'move_lines.partner_id',
+    ]
+
     @api.model
     def _create_invoice_from_picking(self, picking, vals):
-        vals = vals.copy()
+        # stock_account builds vals afresh for each call, so there is no need to copy it before adding to it.
         vals['source_stock_picking_id'] = picking.id
         return super(StockPicking, self)._create_invoice_from_picking(picking, vals)
 
+    @api.multi
+    def action_invoice_create_batch(self, journal_id, group=False, type='out_invoice', batch_size=500):
+        """Invoice a large number of pickings, batch_size pickings at a time, and return the ids of the invoices.
+
+        Goes through the standard action_invoice_create(), so _create_invoice_from_picking() and all its overrides
+        still apply, with the picking types, partners and moves they look at loaded for the whole batch beforehand,
+        and stored computed fields recomputed once per batch.
+        """
+        invoice_ids = []
+        for start in range(0, len(self), batch_size):
+            pickings = self[start:start + batch_size]
+            for path in self._invoice_prefetch_paths:
+                pickings.mapped(path)
+            with self.env.norecompute():
+                invoice_ids.extend(pickings.action_invoice_create(journal_id, group=group, type=type))
+            self.recompute()
+            self.invalidate_cache()
+        return invoice_ids
+
+    @api.multi
+    @api.depends('created_invoice_ids.state', 'created_invoice_ids.type', 'created_invoice_ids.amount_total')
+    def _compute_created_invoice_totals(self):
+        """Count and total the non-cancelled invoices of every picking in self with a single grouped query.
+
+        Refunds count negatively towards the total.
+        """
+        picking_ids = [picking.id for picking in self if not isinstance(picking.id, models.NewId)]
+        totals = {}
+        if picking_ids:
+            groups = self.env['account.invoice'].sudo().read_group(
+                [('source_stock_picking_id', 'in', picking_ids), ('state', '!=', 'cancel')],
+                ['source_stock_picking_id', 'type', 'amount_total'],
+                ['source_stock_picking_id', 'type'],
+                lazy=False,
+            )
+            for group in groups:
+                picking_id = group['source_stock_picking_id'][0]
+                count, amount = totals.get(picking_id, (0, 0.0))
+                sign = -1 if group['type'] in ('out_refund', 'in_refund') else 1
+                totals[picking_id] = (count + group['__count'], amount + sign * group['amount_total'])
+        for picking in self:
+            picking.created_invoice_count, picking.created_invoice_amount_total = totals.get(picking.id, (0, 0.0))
+
+
 # vim:expandtab:smartindent:tabstop=4:softtabstop=4:shiftwidth=4:
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#
+# Link to stock picking from invoice
+# Copyright (C) 2017 OpusVL (<http://opusvl.com/>)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+##############################################################################
+
+from openerp import models
+
+LAST_ID_PARAM = 'account_invoice_stock_picking_link.backfill_last_invoice_id'
+
+
+class BackfillSourceStockPicking(models.TransientModel):
+    """Fill in source_stock_picking_id on invoices created before this module was installed.
+    """
+    _name = 'account.invoice.backfill.stock.picking'
+    _inherit = 'account.extras.invoice.backfill'
+    _description = 'Link existing invoices to their picking'
+
+    _backfill_last_id_param = LAST_ID_PARAM
+    _backfill_source_model = 'stock.picking'
+
+    def _backfill_prepare(self, cr):
+        # Resolve picking names once for the whole run; the temporary table lives as long as the connection.
+        cr.execute("drop table if exists backfill_picking_name")
+        cr.execute("""
+            create temporary table backfill_picking_name on commit preserve rows as
+            select name, company_id, min(id) as picking_id
+            from stock_picking
+            group by name, company_id
+            having count(*) = 1
+        """)
+        cr.execute("create index on backfill_picking_name (name)")
+
+    def _backfill_batch(self, cr, lower_id, upper_id):
+        """Link the invoices with lower_id < id <= upper_id, and return the ids of the pickings they were linked to.
+
+        Invoicing a picking sets the origin of the invoice to the name of the picking, so that is what invoices are
+        matched on, within their company, ignoring names shared by several pickings.
+        """
+        cr.execute("""
+            update account_invoice ai
+            set source_stock_picking_id = p.picking_id
+            from backfill_picking_name p
+            where ai.id > %(lower_id)s and ai.id <= %(upper_id)s
+                and ai.source_stock_picking_id is null
+                and ai.origin = p.name
+                and ai.company_id is not distinct from p.company_id
+            returning ai.source_stock_picking_id
+        """, {'lower_id': lower_id, 'upper_id': upper_id})
+        return [row[0] for row in cr.fetchall()]
+
+# vim:expandtab:smartindent:tabstop=4:softtabstop=4:shiftwidth=4:
@@ -31,14 +31,34 @@
     'category': 'Accounting',
     
     'description': """Add print option to a journal entry,
+
+Set the system parameter ``account_journal_entry_printout.pdf_workers`` to
+the number of wkhtmltopdf processes a printout may run at the same time
+(1 by default) to have large printouts turned into PDF in parallel.
+
+The entries are read from the read replica named by
+``account_entries_report_replica`` in the server configuration file, if any,
+see ``account_extras_database``.
+
+The PDFs of posted entries are kept as attachments and reused in later
+printouts until the entry, its lines or their reconciliations are changed, or
+the entry is cancelled.  The least recently used ones are dropped daily once
+they take up more than ``account_journal_entry_printout.pdf_cache_size`` bytes
+(512 MB by default).
+
+For volumes too large to print, ``account.move.export_journal_entry_lines()``
+writes the lines of the entries matching a domain, with the columns of the
+printout, to a CSV or XLSX file (the latter needs the xlsxwriter Python module).
 """,
     'images': [
     ],
     'depends': [
         'account',
+        'account_extras_database',
     ],
     'data': [
         'reports/journal_entry.xml',
+        'data/ir_cron.xml',
     ],
     'demo': [
     ],
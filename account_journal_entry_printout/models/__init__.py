@@ -20,8 +20,14 @@
 #
 ##############################################################################
 
-# from . import (
+from . import (
 
-# )
+    report_journal_entry_printout,
+
+    report,
+
+    account_move,
+
+)
 
 # vim:expandtab:smartindent:tabstop=4:softtabstop=4:shiftwidth=4:
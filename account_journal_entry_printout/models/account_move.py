@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#
+# Print Journal Entries
+# Copyright (C) 2017 OpusVL (<http://opusvl.com/>)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+##############################################################################
+
+import csv
+import hashlib
+import logging
+
+from openerp import tools
+from openerp import models, fields, api
+from openerp.exceptions import Warning
+from openerp.tools.translate import _
+
+from openerp.addons.account_extras_database import export
+
+from .report import CACHE_PREFIX
+from .report_journal_entry_printout import REPORT_NAME
+
+_logger = logging.getLogger(__name__)
+
+try:
+    import xlsxwriter
+except ImportError:
+    _logger.debug('Cannot import xlsxwriter, exporting journal entries to XLSX will not be available')
+    xlsxwriter = None
+
+# Rows per worksheet in an XLSX file, less the heading.
+XLSX_MAX_ROWS = 1048575
+
+
+class AccountMove(models.Model):
+    _inherit = 'account.move'
+
+    # SQL for the columns of the printout that are not stored on account_move_line.
+    _export_column_sql = {
+        'invoice': '(select ai.id from account_invoice ai where ai.move_id = "account_move_line".move_id limit 1)',
+    }
+
+    @api.multi
+    def button_cancel(self):
+        res = super(AccountMove, self).button_cancel()
+        self._drop_cached_pdfs()
+        return res
+
+    @api.multi
+    def _printout_version(self):
+        """Return the version of the move its cached PDF is named after, see the attachment expression of the report.
+        """
+        self.ensure_one()
+        versions = self.env.context.get('journal_entry_versions') or {}
+        if self.id in versions:
+            return versions[self.id]
+        return self._printout_versions(self.env.cr)[self.id]
+
+    @api.multi
+    def _printout_versions(self, cr):
+        """Return a dictionary of the versions of the moves as printed, as read with cr.
+
+        The version changes with the write_date of the move or of any of its lines, and with the reconciliations of
+        the lines, which are printed but are undone by deleting the reconciliation, without writing to the lines.
+        """
+        cr.execute("""
+            select m.id, m.write_date, max(l.write_date),
+                string_agg(l.id || ':' || coalesce(l.reconcile_id, 0) || ':' || coalesce(l.reconcile_partial_id, 0),
+                           ',' order by l.id)
+            from account_move m
+                left join account_move_line l on (l.move_id = m.id)
+            where m.id in %s
+            group by m.id
+        """, (tuple(self.ids) or (0,),))
+        return dict(
+            (row[0], hashlib.sha1(tools.ustr(row[1:]).encode('utf-8')).hexdigest()[:16]) for row in cr.fetchall()
+        )
+
+    @api.multi
+    def _drop_cached_pdfs(self):
+        """Remove the cached printouts of the moves, which no longer match them once they are unposted.
+        """
+        attachments = self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_id', 'in', self.ids),
+            ('datas_fname', '=like', CACHE_PREFIX + '%'),
+        ])
+        attachments.unlink()
+
+    @api.model
+    def export_journal_entry_lines(self, fileobj, domain=None, file_format='csv', batch_size=2000):
+        """Write the lines of the journal entries matching domain to fileobj, with the columns of the printout.
+
+        file_format is 'csv' or 'xlsx'.  Lines are read from a server side cursor, batch_size at a time, and written out
+        as they come, so memory use does not grow with the number of entries.  Return the number of lines written.
+        """
+        line_columns = self.env['report.' + REPORT_NAME]._line_columns()
+        headings = [heading for name, heading, css_class in line_columns]
+        rows = self._iter_journal_entry_lines(
+            domain or [], [name for name, heading, css_class in line_columns], batch_size=batch_size,
+        )
+        if file_format == 'csv':
+            return self._export_csv(fileobj, headings, rows)
+        if file_format == 'xlsx':
+            return self._export_xlsx(fileobj, headings, rows)
+        raise Warning(_('Unknown export format: %s') % file_format)
+
+    @api.model
+    def _iter_journal_entry_lines(self, domain, field_names, batch_size=2000):
+        """Return an iterator over the printable values of field_names, account.move.line fields, for each line of the
+        entries matching domain, as lists, see account_extras_database/export.py.
+
+        Access rules and record rules apply to both entries and lines.
+        """
+        lines = self.env['account.move.line']
+        self.check_access_rights('read')
+        lines.check_access_rights('read')
+        move_query = self._where_calc(domain)
+        self._apply_ir_rules(move_query, 'read')
+        move_from, move_where, move_params = move_query.get_sql()
+        line_query = lines._where_calc([])
+        lines._apply_ir_rules(line_query, 'read')
+        line_from, line_where, line_params = line_query.get_sql()
+        columns = ', '.join(
+            self._export_column_sql.get(name, '"account_move_line"."%s"' % name) for name in field_names
+        )
+        query = """
+            select {columns}
+            from {line_from}
+            where "account_move_line".move_id in (select "account_move".id from {move_from} where {move_where})
+                and {line_where}
+            order by "account_move_line".move_id, "account_move_line".id
+        """.format(
+            columns=columns,
+            line_from=line_from,
+            move_from=move_from,
+            move_where=move_where or 'true',
+            line_where=line_where or 'true',
+        )
+        return export.iter_printable_rows(
+            self.env, query, move_params + line_params, [lines._fields[name] for name in field_names],
+            batch_size=batch_size, cursor_name='account_journal_entry_printout_export',
+        )
+
+    def _export_csv(self, fileobj, headings, rows):
+        writer = csv.writer(fileobj)
+        writer.writerow([tools.ustr(heading).encode('utf-8') for heading in headings])
+        count = 0
+        for row in rows:
+            writer.writerow([tools.ustr(value).encode('utf-8') if value is not None else '' for value in row])
+            count += 1
+        return count
+
+    def _export_xlsx(self, fileobj, headings, rows):
+        if xlsxwriter is None:
+            raise Warning(_('Exporting to XLSX requires the Python module xlsxwriter.'))
+        workbook = xlsxwriter.Workbook(fileobj, {'constant_memory': True})
+        count = 0
+        worksheet = None
+        for row in rows:
+            if count % XLSX_MAX_ROWS == 0:
+                worksheet = workbook.add_worksheet()
+                worksheet.write_row(0, 0, headings)
+            worksheet.write_row(count % XLSX_MAX_ROWS + 1, 0, row)
+            count += 1
+        if worksheet is None:
+            workbook.add_worksheet().write_row(0, 0, headings)
+        workbook.close()
+        return count
+
+
+# vim:expandtab:smartindent:tabstop=4:softtabstop=4:shiftwidth=4:
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#
+# Print Journal Entries
+# Copyright (C) 2017 OpusVL (<http://opusvl.com/>)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+##############################################################################
+
+import base64
+import logging
+import os
+import tempfile
+import threading
+import time
+from multiprocessing.pool import ThreadPool
+
+from openerp import SUPERUSER_ID
+from openerp import models, fields, api
+from openerp.exceptions import AccessError
+from openerp.tools.safe_eval import safe_eval as eval
+
+from .report_journal_entry_printout import REPORT_NAME
+
+_logger = logging.getLogger(__name__)
+
+WORKERS_PARAM = 'account_journal_entry_printout.pdf_workers'
+CACHE_SIZE_PARAM = 'account_journal_entry_printout.pdf_cache_size'
+
+# Default limit of the cache of PDFs of posted moves, in bytes.
+DEFAULT_CACHE_SIZE = 512 * 1024 * 1024
+
+# Prefix of the names of the attachments making up the cache, see the attachment expression of the report.
+CACHE_PREFIX = 'journal_entry_'
+
+# State of the journal entry printout currently being turned into a PDF on this thread, set by get_pdf():
+# - workers: how many wkhtmltopdf processes it may use, for _run_wkhtmltopdf(), which isn't told which report it is
+#   working on;
+# - save_in_attachment: the cached PDFs and the names to save new ones under, for _check_attachment_use().
+_printout = threading.local()
+
+
+class Report(models.Model):
+    _inherit = 'report'
+
+    @api.v7
+    def get_pdf(self, cr, uid, ids, report_name, html=None, data=None, context=None):
+        if report_name != REPORT_NAME:
+            return super(Report, self).get_pdf(cr, uid, ids, report_name, html=html, data=data, context=context)
+        if context is None:
+            context = {}
+        params = self.pool['ir.config_parameter']
+        _printout.workers = max(int(params.get_param(cr, SUPERUSER_ID, WORKERS_PARAM, '1') or 1), 1)
+        try:
+            if html is None:
+                # Look the cached PDFs up first, so that the moves they are for are left out of the HTML.
+                report = self._get_report_from_name(cr, uid, report_name)
+                _printout.save_in_attachment = self._journal_entry_cache_lookup(cr, uid, ids, report, context=context)
+                cached_ids = list(_printout.save_in_attachment['loaded_documents'])
+                html = self.get_html(
+                    cr, uid, ids, report_name, data=data, context=dict(context, journal_entry_cached_ids=cached_ids),
+                )
+            return super(Report, self).get_pdf(cr, uid, ids, report_name, html=html, data=data, context=context)
+        finally:
+            _printout.workers = 1
+            _printout.save_in_attachment = None
+
+    @api.v8
+    def get_pdf(self, records, report_name, html=None, data=None):
+        return self._model.get_pdf(self._cr, self._uid, records.ids, report_name, html=html, data=data,
+                                   context=self._context)
+
+    def _check_attachment_use(self, cr, uid, ids, report):
+        save_in_attachment = getattr(_printout, 'save_in_attachment', None)
+        if report.report_name == REPORT_NAME and save_in_attachment is not None:
+            return save_in_attachment
+        return super(Report, self)._check_attachment_use(cr, uid, ids, report)
+
+    def _journal_entry_cache_lookup(self, cr, uid, ids, report, context=None):
+        """Return the save_in_attachment dictionary of _check_attachment_use() for a journal entry printout.
+
+        The attachment expression of the report names the PDF of a posted move after its id, _printout_version() and
+        language, so a cached PDF is only found as long as the move is printed the same.  All of them are looked up
+        with one search, rather than one per move, and the ones found are touched so that _trim_pdf_cache() drops the
+        least recently used ones first.  Nothing is cached when the printout is in a language chosen by the user.
+        """
+        save_in_attachment = {'model': report.model, 'loaded_documents': {}}
+        if not report.attachment or (context or {}).get('translatable') is True:
+            return save_in_attachment
+        filenames = {}
+        moves = self.pool[report.model].browse(cr, uid, ids, context=context)
+        # The versions of all the moves, read at once rather than by each evaluation of the attachment expression.
+        moves = moves.with_context(journal_entry_versions=moves._printout_versions(cr))
+        for move in moves:
+            filename = eval(report.attachment, {'object': move, 'time': time})
+            if filename:
+                filenames[move.id] = filename
+        if report.attachment_use and filenames:
+            attachment_obj = self.pool['ir.attachment']
+            attachment_ids = attachment_obj.search(cr, uid, [
+                ('res_model', '=', report.model),
+                ('res_id', 'in', list(filenames)),
+                ('datas_fname', 'in', list(set(filenames.values()))),
+            ], context=context)
+            used_ids = []
+            loaded_documents = save_in_attachment['loaded_documents']
+            for attachment in attachment_obj.browse(cr, uid, attachment_ids, context=context):
+                if filenames.get(attachment.res_id) != attachment.datas_fname or attachment.res_id in loaded_documents:
+                    continue
+                loaded_documents[attachment.res_id] = base64.decodestring(attachment.datas)
+                used_ids.append(attachment.id)
+            if used_ids:
+                cr.execute(
+                    "update ir_attachment set write_date = now() at time zone 'UTC' where id in %s",
+                    (tuple(used_ids),),
+                )
+                _logger.debug('Reusing the cached PDFs of %d journal entries', len(used_ids))
+        for move_id, filename in filenames.items():
+            if move_id not in save_in_attachment['loaded_documents']:
+                save_in_attachment[move_id] = filename
+        return save_in_attachment
+
+    @api.model
+    def _trim_pdf_cache(self):
+        """Drop the least recently used PDFs of posted moves until the cache is within CACHE_SIZE_PARAM bytes.
+        """
+        params = self.env['ir.config_parameter'].sudo()
+        limit = int(params.get_param(CACHE_SIZE_PARAM, DEFAULT_CACHE_SIZE) or 0)
+        self.env.cr.execute(
+            """select id, file_size from ir_attachment
+               where res_model = 'account.move' and datas_fname like %s
+               order by write_date desc, id desc""",
+            (CACHE_PREFIX + '%',),
+        )
+        total = 0
+        stale_ids = []
+        for attachment_id, file_size in self.env.cr.fetchall():
+            total += file_size or 0
+            if total > limit:
+                stale_ids.append(attachment_id)
+        if stale_ids:
+            _logger.info('Dropping %d PDFs from the journal entry printout cache', len(stale_ids))
+            self.env['ir.attachment'].sudo().browse(stale_ids).unlink()
+        return True
+
+    def _run_wkhtmltopdf(self, cr, uid, headers, footers, bodies, landscape, paperformat, spec_paperformat_args=None,
+                         save_in_attachment=None, set_viewport_size=False):
+        """Run the wkhtmltopdf processes of a journal entry printout side by side, when so configured.
+
+        Each move of the printout is a page of its own, which the standard implementation turns into a PDF with one
+        wkhtmltopdf process after the other before merging them.  Here the pages are shared among up to
+        WORKERS_PARAM processes at a time, and the resulting PDFs merged in their original order.  Pages of moves
+        with a cached PDF are taken from the cache, and the PDFs of the others saved to it once they are all done.
+        """
+        workers = getattr(_printout, 'workers', 1)
+        if workers <= 1 or len(bodies) <= 1:
+            return super(Report, self)._run_wkhtmltopdf(
+                cr, uid, headers, footers, bodies, landscape, paperformat,
+                spec_paperformat_args=spec_paperformat_args, save_in_attachment=save_in_attachment,
+                set_viewport_size=set_viewport_size,
+            )
+        save_in_attachment = save_in_attachment or {}
+        loaded_documents = save_in_attachment.get('loaded_documents') or {}
+
+        def render_page(index):
+            # Only wkhtmltopdf and temporary files are involved here, so this is safe off the main thread; the cursor
+            # is passed along but not used.
+            return super(Report, self)._run_wkhtmltopdf(
+                cr, uid, headers[index:index + 1], footers[index:index + 1], bodies[index:index + 1], landscape,
+                paperformat, spec_paperformat_args=spec_paperformat_args, set_viewport_size=set_viewport_size,
+            )
+
+        reportids = [reportid for reportid, body in bodies]
+        to_render = [index for index, reportid in enumerate(reportids) if reportid not in loaded_documents]
+        pages = dict((index, loaded_documents[reportid]) for index, reportid in enumerate(reportids)
+                     if reportid in loaded_documents)
+        if to_render:
+            _logger.debug('Rendering %d pages with %d wkhtmltopdf processes', len(to_render), workers)
+            pool = ThreadPool(min(workers, len(to_render)))
+            try:
+                pages.update(zip(to_render, pool.map(render_page, to_render)))
+            finally:
+                pool.close()
+                pool.join()
+        attachment_obj = self.pool['ir.attachment']
+        for index in to_render:
+            filename = save_in_attachment.get(reportids[index])
+            if not filename:
+                continue
+            try:
+                attachment_obj.create(cr, uid, {
+                    'name': filename,
+                    'datas': base64.encodestring(pages[index]),
+                    'datas_fname': filename,
+                    'res_model': save_in_attachment.get('model'),
+                    'res_id': reportids[index],
+                })
+            except AccessError:
+                _logger.warning('Cannot save PDF report %r as attachment', filename)
+        return self._merge_pdf_contents([pages[index] for index in range(len(bodies))])
+
+    def _merge_pdf_contents(self, pdfs):
+        """Return the PDF made of the given PDF documents (as strings), one after the other.
+        """
+        paths = []
+        try:
+            for pdf in pdfs:
+                fd, path = tempfile.mkstemp(suffix='.pdf', prefix='report.page.tmp.')
+                paths.append(path)
+                with os.fdopen(fd, 'wb') as page_file:
+                    page_file.write(pdf)
+            merged_path = self._merge_pdf(paths)
+            paths.append(merged_path)
+            with open(merged_path, 'rb') as merged_file:
+                return merged_file.read()
+        finally:
+            for path in paths:
+                try:
+                    os.unlink(path)
+                except OSError:
+                    _logger.error('Error when trying to remove file %s', path)
+
+# vim:expandtab:smartindent:tabstop=4:softtabstop=4:shiftwidth=4:
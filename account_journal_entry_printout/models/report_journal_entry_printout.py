@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#
+# Print Journal Entries
+# Copyright (C) 2017 OpusVL (<http://opusvl.com/>)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+##############################################################################
+
+from openerp import models, fields, api
+from openerp.tools.translate import _
+
+from openerp.addons.account_extras_database.replica import call_with_replica
+
+REPORT_NAME = 'account_journal_entry_printout.report_journal_entry_printout'
+
+
+class ReportJournalEntryPrintout(models.AbstractModel):
+    _name = 'report.account_journal_entry_printout.report_journal_entry_printout'
+
+    # Moves are rendered this many at a time, with the cache emptied in between.
+    _chunk_size = 200
+
+    # Relations of the moves dereferenced by report_journal_entry_printout_document, read for a whole chunk of moves at
+    # once.  The relations of the lines are taken from _line_columns().
+    _move_prefetch_paths = [
+        'journal_id',
+        'period_id',
+        'company_id',
+        'partner_id',
+    ]
+
+    @api.multi
+    def render_html(self, data=None):
+        report_obj = self.env['report']
+        report = report_obj._get_report_from_name(REPORT_NAME)
+        moves = self.env[report.model].browse(self._ids)
+        # Moves whose PDF the report model has found in its cache only need a placeholder page, which tells it where to
+        # put the cached PDF.
+        cached_ids = set(self.env.context.get('journal_entry_cached_ids') or [])
+
+        def render_chunks(cursor):
+            # The moves are read and rendered from the replica, if one is configured, see
+            # account_extras_database/replica.py, unless it hasn't caught up with them yet: what is
+            # printed may end up in the PDF cache under their current version.
+            printed_moves = self.env['account.move'].browse(self._ids)
+            if cursor is not self.env.cr and (printed_moves._printout_versions(cursor) !=
+                                              printed_moves._printout_versions(self.env.cr)):
+                cursor = self.env.cr
+            printout = self.with_env(self.env(cr=cursor))
+            chunks = []
+            for lang, chunk_ids in printout._language_chunks(printout.env[report.model].browse(self._ids)):
+                chunks.append(printout._render_chunk(lang, chunk_ids, cached_ids))
+                printout.env.invalidate_all()
+            return chunks
+        chunks = call_with_replica(self.env.cr, render_chunks)
+        docargs = {
+            'doc_ids': self._ids,
+            'doc_model': report.model,
+            'docs': moves,
+            'chunks': chunks,
+        }
+        return report_obj.render(REPORT_NAME, docargs)
+
+    @api.model
+    def _line_columns(self):
+        """Return the columns of the table of lines in report_journal_entry_printout_document, as (account.move.line
+        field, heading, class of the cells), with the headings in the language of the context.
+
+        The template and the export of account.move are both made from this.
+        """
+        return [
+            ('invoice', _('Invoice'), ''),
+            ('name', _('Name'), ''),
+            ('partner_id', _('Partner'), ''),
+            ('account_id', _('Account'), ''),
+            ('date_maturity', _('Due date'), ''),
+            ('debit', _('Debit'), 'text-right'),
+            ('credit', _('Credit'), 'text-right'),
+            ('amount_currency', _('Amt.Curr.'), 'text-right'),
+            ('currency_id', _('Currency'), ''),
+            ('tax_code_id', _('Tax Acct'), ''),
+            ('tax_amount', _('Tax/base amt'), ''),
+            ('state', _('Status'), ''),
+            ('reconcile_id', _('Reconcile'), ''),
+            ('reconcile_partial_id', _('Part. Reconcile'), ''),
+        ]
+
+    @api.model
+    def _language_chunks(self, moves):
+        """Split moves into runs of consecutive moves printed in the same language, at most _chunk_size long.
+
+        Like translate_doc(), which this replaces, each move is printed in the language of its partner, unless the
+        report is being printed in a language chosen by the user.
+        """
+        if self.env.context.get('translatable') is True:
+            languages = dict.fromkeys(moves.ids, self.env.context.get('lang'))
+        else:
+            languages = dict((move.id, move.partner_id.lang) for move in moves)
+        chunks = []
+        for move_id in moves.ids:
+            lang = languages[move_id]
+            if not chunks or chunks[-1][0] != lang or len(chunks[-1][1]) >= self._chunk_size:
+                chunks.append((lang, []))
+            chunks[-1][1].append(move_id)
+        return chunks
+
+    @api.model
+    def _render_chunk(self, lang, move_ids, cached_ids=()):
+        # Branded like report.render() does, so that the report model can tell which move each page is for.
+        env = self.with_context(lang=lang, inherit_branding=True).env
+        moves = env['account.move'].browse(move_ids)
+        printed = moves.filtered(lambda move: move.id not in cached_ids)
+        for path in self._move_prefetch_paths:
+            printed.mapped(path)
+        lines = printed.mapped('line_id')
+        printout = self.with_env(env)
+        line_columns = printout._line_columns()
+        for name, heading, css_class in line_columns:
+            if lines._fields[name].type == 'many2one':
+                lines.mapped(name).mapped('display_name')
+        return env['ir.ui.view'].render(
+            'account_journal_entry_printout.report_journal_entry_printout_chunk',
+            {
+                'docs': moves,
+                'cached_ids': cached_ids,
+                'line_columns': line_columns,
+                'line_cell': printout._line_cell,
+            },
+        )
+
+    @api.model
+    def _line_cell(self, line, name):
+        """Return the HTML of field name of line, as <span t-field="line.name"/> would print it.
+        """
+        converter = self.pool['ir.qweb'].get_converter_for(line._fields[name].type)
+        return converter.record_to_html(self.env.cr, self.env.uid, name, line, {}, context=self.env.context) or ''
+
+# vim:expandtab:smartindent:tabstop=4:softtabstop=4:shiftwidth=4:
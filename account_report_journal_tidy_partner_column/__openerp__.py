@@ -31,6 +31,13 @@
     'category': 'Accounting',
     
     'description': """Remove res.partner() from Partner column on Accounting -> Reporting -> Legal Reports -> Journals -> Journals,
+
+Partner names are cut to the length set on the company (23 characters by
+default), and read for all the lines of a page with one query.
+
+The lines of each journal and period are read
+``account_report_journal_tidy_partner_column.page_size`` (1000 by default)
+at a time, so that very large journals print in flat memory.
 """,
     'images': [
     ],
@@ -39,6 +46,7 @@
     ],
     'data': [
         'views/account_report_journal.xml',
+        'views/res_company.xml',
     ],
     'demo': [
     ],
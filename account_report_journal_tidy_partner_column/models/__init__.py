@@ -20,8 +20,12 @@
 #
 ##############################################################################
 
-# from . import (
+from . import (
 
-# )
+    res_company,
+
+    account_report_journal,
+
+)
 
 # vim:expandtab:smartindent:tabstop=4:softtabstop=4:shiftwidth=4:
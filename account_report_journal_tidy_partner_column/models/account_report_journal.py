@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#
+# Tidy Partner column of Journals legal report
+# Copyright (C) 2016 OpusVL (<http://opusvl.com/>)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+##############################################################################
+
+from openerp import models, SUPERUSER_ID
+
+from openerp.addons.account.report.account_journal import journal_print
+
+PAGE_SIZE_PARAM = 'account_report_journal_tidy_partner_column.page_size'
+
+# Default number of lines read at a time, see journal_print_tidy_partner.lines().
+DEFAULT_PAGE_SIZE = 1000
+
+
+class journal_print_tidy_partner(journal_print):
+    """The parser of the Journals report, with the lines read a page at a time and the labels of the Partner column
+    read for all lines of a page at once.
+    """
+
+    def __init__(self, cr, uid, name, context=None):
+        super(journal_print_tidy_partner, self).__init__(cr, uid, name, context=context)
+        self.partner_labels = {}
+        self.localcontext.update({
+            'partner_label': self._partner_label,
+        })
+
+    def lines(self, period_id, journal_id=False):
+        """Generate the lines of the journals in the period, in the order of the standard implementation.
+
+        Rather than all at once, the lines are read PAGE_SIZE_PARAM at a time, resuming after the (sort key, move,
+        line) of the last line of the previous page, and the cache is emptied between pages, so that memory use does
+        not grow with the size of the journal.
+        """
+        if not journal_id:
+            journal_id = self.journal_ids
+        else:
+            journal_id = [journal_id]
+        obj_mline = self.pool.get('account.move.line')
+        self.cr.execute(
+            'update account_journal_period set state=%s where journal_id IN %s and period_id=%s and state=%s',
+            ('printed', self.journal_ids, period_id, 'draft'),
+        )
+        self.pool.get('account.journal.period').invalidate_cache(self.cr, self.uid, ['state'], context=self.context)
+
+        move_state = ['draft', 'posted']
+        if self.target_move == 'posted':
+            move_state = ['posted']
+        params = self.pool['ir.config_parameter']
+        page_size = int(params.get_param(self.cr, SUPERUSER_ID, PAGE_SIZE_PARAM, DEFAULT_PAGE_SIZE) or DEFAULT_PAGE_SIZE)
+
+        query = (
+            'SELECT ' + self.sort_selection + ', l.move_id, l.id'
+            ' FROM account_move_line l, account_move am'
+            ' WHERE l.move_id=am.id AND am.state IN %s AND l.period_id=%s AND l.journal_id IN %s '
+            + self.query_get_clause
+        )
+        query_args = (tuple(move_state), period_id, tuple(journal_id))
+        order = ' ORDER BY ' + self.sort_selection + ', l.move_id, l.id LIMIT %s'
+        keyset = ' AND (' + self.sort_selection + ', l.move_id, l.id) > (%s, %s, %s)'
+        last = None
+        while True:
+            if last is None:
+                self.cr.execute(query + order, query_args + (page_size,))
+            else:
+                self.cr.execute(query + keyset + order, query_args + last + (page_size,))
+            rows = self.cr.fetchall()
+            if not rows:
+                break
+            last = tuple(rows[-1])
+            line_ids = [row[2] for row in rows]
+            self.partner_labels = self._partner_labels(line_ids)
+            for line in obj_mline.browse(self.cr, self.uid, line_ids, context=self.context):
+                yield line
+            if len(rows) < page_size:
+                break
+            obj_mline.invalidate_cache(self.cr, self.uid, context=self.context)
+
+    def _partner_labels(self, line_ids):
+        """Return the label of the partner of each of the lines, by line id, truncated as set on their company.
+        """
+        if not line_ids:
+            return {}
+        self.cr.execute(
+            """select l.id, p.name, c.journal_report_partner_length
+               from account_move_line l
+               join res_partner p on p.id = l.partner_id
+               join res_company c on c.id = l.company_id
+               where l.id in %s""",
+            (tuple(line_ids),),
+        )
+        return dict(
+            (line_id, (name or '')[:length] if length else (name or ''))
+            for line_id, name, length in self.cr.fetchall()
+        )
+
+    def _partner_label(self, line):
+        return self.partner_labels.get(line.id, '')
+
+
+class report_journal(models.AbstractModel):
+    _inherit = 'report.account.report_journal'
+    _wrapped_report_class = journal_print_tidy_partner
+
+# vim:expandtab:smartindent:tabstop=4:softtabstop=4:shiftwidth=4:
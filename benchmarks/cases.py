@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#
+# Account extras benchmarks
+# Copyright (C) 2017 OpusVL (<http://opusvl.com/>)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+##############################################################################
+
+"""The benchmark cases.
+
+Each case is a function of an environment and the fixture size, which sets up whatever it needs and returns the
+function of no arguments to be measured.  Cases are measured inside a savepoint that is rolled back afterwards, so they
+may write freely.
+"""
+
+from collections import OrderedDict
+
+from fixture import fixture_orders
+
+JOURNAL_ENTRY_PRINTOUT = 'account_journal_entry_printout.report_journal_entry_printout'
+
+
+def entries_report_read_group(env, size):
+    report = env['account.entries.report']
+
+    def run():
+        report.read_group([], ['debit', 'credit', 'balance'], ['period_id', 'account_id'], lazy=False)
+        report.read_group([('move_state', '=', 'posted')], ['balance'], ['partner_id'], lazy=False)
+    return run
+
+
+def sale_prepare_invoice(env, size):
+    orders = fixture_orders(env, limit=size)
+    order_obj = env['sale.order']
+
+    def run():
+        for order in orders:
+            order_obj._prepare_invoice(order, [])
+    return run
+
+
+def sale_invoice_create(env, size):
+    orders = fixture_orders(env, limit=size).filtered(
+        lambda order: order.order_policy == 'manual' and not order.invoice_ids
+    )
+
+    def run():
+        orders.action_invoice_create()
+    return run
+
+
+def picking_invoice_create(env, size):
+    orders = fixture_orders(env, limit=size)
+    pickings = orders.mapped('picking_ids').filtered(lambda picking: picking.invoice_state == '2binvoiced')
+    journal = env['account.journal'].search([('type', '=', 'sale')], limit=1)
+
+    def run():
+        pickings.action_invoice_create(journal.id)
+    return run
+
+
+def open_created_invoices(env, size):
+    orders = fixture_orders(env, limit=size)
+
+    def run():
+        # What the order form and its Invoices tab read, one order after the other.
+        for order in orders:
+            order.read(['name', 'created_invoice_ids', 'created_invoice_count', 'created_invoice_amount_total'])
+            order.created_invoice_ids.read(['number', 'date_invoice', 'amount_total', 'state'])
+    return run
+
+
+def journal_entry_printout(env, size):
+    moves = env['account.move'].search([('state', '=', 'posted')], order='id desc', limit=size)
+
+    def run():
+        env['report'].get_html(moves, JOURNAL_ENTRY_PRINTOUT)
+    return run
+
+
+CASES = OrderedDict([
+    ('entries_report_read_group', entries_report_read_group),
+    ('sale_prepare_invoice', sale_prepare_invoice),
+    ('sale_invoice_create', sale_invoice_create),
+    ('picking_invoice_create', picking_invoice_create),
+    ('open_created_invoices', open_created_invoices),
+    ('journal_entry_printout', journal_entry_printout),
+])
+
+# vim:expandtab:smartindent:tabstop=4:softtabstop=4:shiftwidth=4:
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#
+# Account extras benchmarks
+# Copyright (C) 2017 OpusVL (<http://opusvl.com/>)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+##############################################################################
+
+"""A small data set for the benchmarks, made through the ORM so that it is valid whatever is installed.
+
+Every record is marked with PREFIX, so that it is found again rather than made anew on the next run.
+"""
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+PREFIX = 'BENCH-'
+
+
+def ensure_fixture(env, size):
+    """Make sure there are at least size benchmark customers, each with a confirmed sale order, and commit.
+
+    Orders are set to be invoiced in turn on delivery, from the order and left uninvoiced, and from the order and
+    invoiced, so that there are pickings and orders to invoice as well as posted journal entries.
+    """
+    partners = env['res.partner'].search([('ref', '=like', PREFIX + '%'), ('parent_id', '=', False)])
+    if len(partners) >= size:
+        return
+    product = env['product.product'].search([('default_code', '=', PREFIX + 'PRODUCT')])
+    if not product:
+        product = env['product.product'].create({
+            'name': 'Benchmark product',
+            'default_code': PREFIX + 'PRODUCT',
+            'type': 'consu',
+            'list_price': 10.0,
+        })
+    _logger.info('Making benchmark orders %d to %d', len(partners), size)
+    for index in range(len(partners), size):
+        partner = env['res.partner'].create({
+            'name': 'Benchmark customer %d' % index,
+            'ref': '%s%05d' % (PREFIX, index),
+            'customer': True,
+        })
+        shipping = env['res.partner'].create({
+            'name': 'Benchmark delivery address %d' % index,
+            'parent_id': partner.id,
+            'type': 'delivery',
+        })
+        order = env['sale.order'].create({
+            'partner_id': partner.id,
+            'partner_invoice_id': partner.id,
+            'partner_shipping_id': shipping.id,
+            'pricelist_id': partner.property_product_pricelist.id,
+            'order_policy': 'picking' if index % 3 == 0 else 'manual',
+            'client_order_ref': '%s%05d' % (PREFIX, index),
+            'order_line': [(0, 0, {
+                'product_id': product.id,
+                'name': product.name,
+                'product_uom': product.uom_id.id,
+                'product_uom_qty': 1 + index % 5,
+                'price_unit': product.list_price,
+            })],
+        })
+        order.action_button_confirm()
+        if index % 3 == 2:
+            invoice = env['account.invoice'].browse(order.action_invoice_create())
+            invoice.signal_workflow('invoice_open')
+    env.cr.commit()
+
+
+def fixture_orders(env, limit=None):
+    return env['sale.order'].search([('client_order_ref', '=like', PREFIX + '%')], order='id', limit=limit)
+
+# vim:expandtab:smartindent:tabstop=4:softtabstop=4:shiftwidth=4:
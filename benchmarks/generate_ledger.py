@@ -0,0 +1,385 @@
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#
+# Account extras benchmarks
+# Copyright (C) 2017 OpusVL (<http://opusvl.com/>)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+##############################################################################
+
+"""Fill a database with a large, deterministic ledger to load test the account extras modules with.
+
+    python benchmarks/generate_ledger.py -c odoo.conf -d bench --moves 2500000 --lines-per-move 4
+
+Records are cloned from a template of each kind, taken from the benchmark fixture (which is made first if needed): the
+template row is read once with COPY TO, the columns that vary are replaced for every new row, and the rows are written
+back with COPY FROM, a chunk at a time.  Columns nobody here knows about keep the value of the template, so the clones
+are as valid as the template is.  Everything random comes from --seed, so the same options against the same database
+give the same data.
+
+Made are partners, each with a delivery address; accounts; fiscal years with their periods; posted journal entries
+of --lines-per-move lines; and sale orders, each with a delivered picking and an open invoice linked to both through
+source_sale_order_id, source_stock_picking_id and partner_shipping_id, whose journal entries are the first of the
+generated ones.
+
+Everything made is stamped as created and written on the 1st of January of --start-year, which an incremental refresh
+of the materialized Entries Analysis would not pick up, so if the report is materialized its next refresh is made to
+rebuild it in full instead; run one before benchmarking it.
+"""
+
+from __future__ import print_function
+
+import argparse
+import datetime
+import logging
+import random
+import sys
+import time
+from cStringIO import StringIO
+
+import openerp
+from openerp import api, SUPERUSER_ID
+
+from fixture import PREFIX, ensure_fixture, fixture_orders
+
+# Where the materialized Entries Analysis logs what its refresh cannot tell from write_date, see
+# account_entries_report_extension_base/models/account_entries_report.py.
+MATERIALIZED_LOG = 'account_entries_report_materialized_log'
+
+_logger = logging.getLogger('benchmarks.generate_ledger')
+
+# Rows written per COPY.
+CHUNK_SIZE = 50000
+
+
+def copy_value(value):
+    """Return value in the COPY text format.
+    """
+    if value is None:
+        return '\\N'
+    if value is True:
+        return 't'
+    if value is False:
+        return 'f'
+    if isinstance(value, unicode):
+        value = value.encode('utf-8')
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+class TemplateRow(object):
+    """A row of table, to be cloned with some of its columns changed.
+    """
+
+    def __init__(self, cr, table, template_id):
+        self.cr = cr
+        self.table = table
+        cr.execute(
+            """select a.attname from pg_attribute a
+               where a.attrelid = %s::regclass and a.attnum > 0 and not a.attisdropped
+               order by a.attnum""",
+            (table,),
+        )
+        self.columns = [row[0] for row in cr.fetchall()]
+        buf = StringIO()
+        cr.copy_expert('COPY (SELECT * FROM "%s" WHERE id = %d) TO STDOUT' % (table, template_id), buf)
+        self.values = buf.getvalue().rstrip('\n').split('\t')
+        if len(self.values) != len(self.columns):
+            raise ValueError('No %s with id %d to clone' % (table, template_id))
+        self.index = dict((name, index) for index, name in enumerate(self.columns))
+
+    def reserve_ids(self, count):
+        """Take count consecutive ids from the sequence of the table, and return the first.
+        """
+        sequence = '%s_id_seq' % self.table
+        self.cr.execute('SELECT nextval(%s)', (sequence,))
+        first = self.cr.fetchone()[0]
+        self.cr.execute('SELECT setval(%s, %s)', (sequence, first + count - 1))
+        return first
+
+    def copy(self, rows):
+        """Write a clone of the template for each dictionary of column values in rows, CHUNK_SIZE rows per COPY.
+        """
+        statement = 'COPY "%s" (%s) FROM STDIN' % (self.table, ', '.join('"%s"' % name for name in self.columns))
+        index = self.index
+        count = 0
+        buf = StringIO()
+        for count, row in enumerate(rows, 1):
+            values = list(self.values)
+            for name, value in row.iteritems():
+                values[index[name]] = copy_value(value)
+            buf.write('\t'.join(values))
+            buf.write('\n')
+            if count % CHUNK_SIZE == 0:
+                self._flush(statement, buf)
+                buf = StringIO()
+        self._flush(statement, buf)
+        return count
+
+    def _flush(self, statement, buf):
+        if buf.tell():
+            buf.seek(0)
+            self.cr.copy_expert(statement, buf)
+
+
+class LedgerGenerator(object):
+
+    def __init__(self, env, seed, stamp):
+        self.env = env
+        self.cr = env.cr
+        self.random = random.Random(seed)
+        # create_date and write_date of everything made.
+        self.stamp = stamp
+
+        orders = fixture_orders(env)
+        order = orders.filtered(lambda order: order.invoice_ids)[0]
+        invoice = order.invoice_ids[0]
+        picking = orders.mapped('picking_ids')[0]
+        move = invoice.move_id
+        self.company = invoice.company_id
+        self.journal = move.journal_id
+        self.receivable_line = move.line_id.filtered(lambda line: line.debit)[0]
+        self.income_line = move.line_id.filtered(lambda line: line.credit)[0]
+
+        cr = self.cr
+        self.partner_row = TemplateRow(cr, 'res_partner', order.partner_id.id)
+        self.account_row = TemplateRow(cr, 'account_account', self.income_line.account_id.id)
+        self.move_row = TemplateRow(cr, 'account_move', move.id)
+        self.move_line_row = TemplateRow(cr, 'account_move_line', self.receivable_line.id)
+        self.order_row = TemplateRow(cr, 'sale_order', order.id)
+        self.picking_row = TemplateRow(cr, 'stock_picking', picking.id)
+        self.invoice_row = TemplateRow(cr, 'account_invoice', invoice.id)
+
+        self.partner_ids = []
+        self.shipping_ids = {}
+        self.account_ids = []
+        self.periods = []
+        self.moves = []
+
+    def partners(self, count):
+        first = self.partner_row.reserve_ids(2 * count)
+
+        def rows():
+            for number in range(count):
+                partner_id = first + 2 * number
+                name = 'Ledger customer %d' % partner_id
+                yield {
+                    'id': partner_id, 'name': name, 'display_name': name, 'ref': '%sL%d' % (PREFIX, partner_id),
+                    'parent_id': None, 'commercial_partner_id': partner_id, 'type': 'contact', 'is_company': True,
+                    'customer': True, 'create_date': self.stamp, 'write_date': self.stamp,
+                }
+                yield {
+                    'id': partner_id + 1, 'name': 'Delivery', 'display_name': '%s, Delivery' % name, 'ref': None,
+                    'parent_id': partner_id, 'commercial_partner_id': partner_id, 'type': 'delivery',
+                    'is_company': False, 'customer': True, 'create_date': self.stamp, 'write_date': self.stamp,
+                }
+        self.partner_row.copy(rows())
+        self.partner_ids = range(first, first + 2 * count, 2)
+        self.shipping_ids = dict((partner_id, partner_id + 1) for partner_id in self.partner_ids)
+
+    def accounts(self, count):
+        if not count:
+            return
+        first = self.account_row.reserve_ids(count)
+        code = self.income_line.account_id.code
+        rows = ({
+            'id': first + number, 'code': '%s%d' % (code, first + number), 'name': 'Ledger income %d' % number,
+            'parent_left': None, 'parent_right': None, 'create_date': self.stamp, 'write_date': self.stamp,
+        } for number in range(count))
+        self.account_row.copy(rows)
+        self.account_ids = range(first, first + count)
+        self.env['account.account']._parent_store_compute()
+
+    def fiscal_years(self, start_year, years):
+        fiscalyears = self.env['account.fiscalyear']
+        for year in range(start_year, start_year + years):
+            fiscalyear = fiscalyears.search([('code', '=', str(year)), ('company_id', '=', self.company.id)])
+            if not fiscalyear:
+                fiscalyear = fiscalyears.create({
+                    'name': str(year),
+                    'code': str(year),
+                    'date_start': '%d-01-01' % year,
+                    'date_stop': '%d-12-31' % year,
+                    'company_id': self.company.id,
+                })
+                fiscalyear.create_period()
+            fiscalyears |= fiscalyear
+        periods = self.env['account.period'].search([('fiscalyear_id', 'in', fiscalyears.ids), ('special', '=', False)])
+        self.periods = [
+            (period.id, datetime.datetime.strptime(period.date_start, '%Y-%m-%d').date(),
+             (datetime.datetime.strptime(period.date_stop, '%Y-%m-%d').date()
+              - datetime.datetime.strptime(period.date_start, '%Y-%m-%d').date()).days)
+            for period in periods
+        ]
+
+    def journal_entries(self, count, lines_per_move, keep=0):
+        """Make count posted moves of a receivable line and lines_per_move - 1 income lines each.
+
+        Moves are made and written out a chunk at a time, and only the first keep of them are remembered, for
+        sale_orders().
+        """
+        rand = self.random
+        first_move = self.move_row.reserve_ids(count)
+        line_ids = iter(xrange(self.move_line_row.reserve_ids(count * lines_per_move), sys.maxint))
+        journal_id, company_id = self.journal.id, self.company.id
+        receivable_id = self.receivable_line.account_id.id
+        income_ids = self.account_ids or [self.income_line.account_id.id]
+        chunk_size = max(CHUNK_SIZE // lines_per_move, 1)
+        self.moves = []
+        for start in range(0, count, chunk_size):
+            moves = []
+            for move_id in range(first_move + start, first_move + min(start + chunk_size, count)):
+                period_id, date_start, days = rand.choice(self.periods)
+                date = (date_start + datetime.timedelta(days=rand.randint(0, days))).isoformat()
+                amounts = [rand.randint(100, 1000000) / 100.0 for _ in range(lines_per_move - 1)]
+                moves.append((move_id, period_id, date, rand.choice(self.partner_ids), amounts))
+            self.move_row.copy({
+                'id': move_id, 'name': '%s%d' % (PREFIX, move_id), 'ref': None, 'date': date,
+                'period_id': period_id, 'journal_id': journal_id, 'partner_id': partner_id, 'state': 'posted',
+                'company_id': company_id, 'create_date': self.stamp, 'write_date': self.stamp,
+            } for move_id, period_id, date, partner_id, amounts in moves)
+            self.move_line_row.copy(self._move_lines(moves, line_ids, receivable_id, income_ids))
+            self.moves.extend(moves[:max(keep - len(self.moves), 0)])
+
+    def _move_lines(self, moves, line_ids, receivable_id, income_ids):
+        journal_id, company_id = self.journal.id, self.company.id
+        for move_id, period_id, date, partner_id, amounts in moves:
+            common = {
+                'move_id': move_id, 'date': date, 'date_created': date, 'period_id': period_id,
+                'journal_id': journal_id, 'partner_id': partner_id, 'company_id': company_id, 'state': 'valid',
+                'ref': None, 'reconcile_id': None, 'reconcile_partial_id': None, 'reconcile_ref': None,
+                'create_date': self.stamp, 'write_date': self.stamp,
+            }
+            yield dict(common, id=next(line_ids), name='/', account_id=receivable_id, date_maturity=date,
+                       debit=sum(amounts), credit=0.0)
+            for index, amount in enumerate(amounts):
+                yield dict(common, id=next(line_ids), name='Ledger income',
+                           account_id=income_ids[(move_id + index) % len(income_ids)], date_maturity=None,
+                           debit=0.0, credit=amount)
+
+    def sale_orders(self, count):
+        """Make count delivered and invoiced orders, linked to the first count of the generated moves.
+        """
+        count = min(count, len(self.moves))
+        if not count:
+            return
+        first_order = self.order_row.reserve_ids(count)
+        first_picking = self.picking_row.reserve_ids(count)
+        first_invoice = self.invoice_row.reserve_ids(count)
+        account_id = self.receivable_line.account_id.id
+        orders, pickings, invoices, links = [], [], [], []
+        for number, (move_id, period_id, date, partner_id, amounts) in enumerate(self.moves[:count]):
+            order_id, picking_id, invoice_id = first_order + number, first_picking + number, first_invoice + number
+            shipping_id = self.shipping_ids[partner_id]
+            amount = sum(amounts)
+            order_name = '%sSO%d' % (PREFIX, order_id)
+            orders.append({
+                'id': order_id, 'name': order_name, 'client_order_ref': None, 'origin': None, 'date_order': date,
+                'partner_id': partner_id, 'partner_invoice_id': partner_id, 'partner_shipping_id': shipping_id,
+                'procurement_group_id': None, 'state': 'progress', 'amount_untaxed': amount, 'amount_tax': 0.0,
+                'amount_total': amount, 'created_invoice_count': 1, 'created_invoice_amount_total': amount,
+                'create_date': self.stamp, 'write_date': self.stamp,
+            })
+            pickings.append({
+                'id': picking_id, 'name': '%sOUT%d' % (PREFIX, picking_id), 'origin': order_name,
+                'partner_id': shipping_id, 'group_id': None, 'backorder_id': None, 'state': 'done',
+                'invoice_state': 'invoiced', 'date': date, 'min_date': date, 'max_date': date, 'date_done': date,
+                'created_invoice_count': 1, 'created_invoice_amount_total': amount,
+                'create_date': self.stamp, 'write_date': self.stamp,
+            })
+            number_name = '%sINV%d' % (PREFIX, invoice_id)
+            invoices.append({
+                'id': invoice_id, 'number': number_name, 'internal_number': number_name, 'move_name': number_name,
+                'name': None, 'origin': order_name, 'reference': None, 'partner_id': partner_id,
+                'commercial_partner_id': partner_id, 'partner_shipping_id': shipping_id, 'account_id': account_id,
+                'move_id': move_id, 'period_id': period_id, 'date_invoice': date, 'date_due': date, 'state': 'open',
+                'amount_untaxed': amount, 'amount_tax': 0.0, 'amount_total': amount, 'residual': amount,
+                'source_sale_order_id': order_id, 'source_stock_picking_id': picking_id,
+                'create_date': self.stamp, 'write_date': self.stamp,
+            })
+            links.append('%d\t%d\n' % (order_id, invoice_id))
+        self.order_row.copy(orders)
+        self.picking_row.copy(pickings)
+        self.invoice_row.copy(invoices)
+        self.cr.copy_expert('COPY sale_order_invoice_rel (order_id, invoice_id) FROM STDIN', StringIO(''.join(links)))
+
+
+def request_report_rebuild(cr):
+    """Have the next refresh of the Entries Analysis rebuild it in full, if it is materialized.
+
+    A null in the log stands for a change to a dimension of the report, which the refresh handles by a rebuild.
+    """
+    cr.execute("select 1 from pg_class where relname = %s and relkind = 'r'", (MATERIALIZED_LOG,))
+    if cr.fetchone():
+        cr.execute("insert into {log} (line_id) values (null)".format(log=MATERIALIZED_LOG))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-c', '--config', help='Odoo configuration file')
+    parser.add_argument('-d', '--database', required=True)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--partners', type=int, default=10000)
+    parser.add_argument('--accounts', type=int, default=50)
+    parser.add_argument('--start-year', type=int, default=2015)
+    parser.add_argument('--years', type=int, default=3, help='fiscal years, of monthly periods (default 3)')
+    parser.add_argument('--moves', type=int, default=100000)
+    parser.add_argument('--lines-per-move', type=int, default=4)
+    parser.add_argument('--orders', type=int, default=10000, help='at most --moves (default 10000)')
+    args = parser.parse_args(argv)
+    if args.lines_per_move < 2:
+        parser.error('--lines-per-move must be at least 2')
+    if args.partners < 1 or args.moves < 1 or args.years < 1:
+        parser.error('--partners, --moves and --years must be at least 1')
+
+    odoo_args = ['-d', args.database]
+    if args.config:
+        odoo_args[:0] = ['-c', args.config]
+    openerp.tools.config.parse_config(odoo_args)
+    registry = openerp.modules.registry.RegistryManager.get(args.database)
+
+    with api.Environment.manage():
+        cr = registry.cursor()
+        try:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            ensure_fixture(env, 3)
+            stamp = datetime.datetime(args.start_year, 1, 1).strftime('%Y-%m-%d %H:%M:%S')
+            generator = LedgerGenerator(env, args.seed, stamp)
+            steps = [
+                ('partners', lambda: generator.partners(args.partners)),
+                ('accounts', lambda: generator.accounts(args.accounts)),
+                ('fiscal years', lambda: generator.fiscal_years(args.start_year, args.years)),
+                ('journal entries', lambda: generator.journal_entries(args.moves, args.lines_per_move, args.orders)),
+                ('sale orders', lambda: generator.sale_orders(args.orders)),
+            ]
+            for name, step in steps:
+                start = time.time()
+                step()
+                print('%-16s %8.1fs' % (name, time.time() - start))
+            request_report_rebuild(cr)
+            for table in ('res_partner', 'account_account', 'account_move', 'account_move_line', 'sale_order',
+                          'stock_picking', 'account_invoice'):
+                cr.execute('ANALYZE "%s"' % table)
+            cr.commit()
+        finally:
+            cr.rollback()
+            cr.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
+
+# vim:expandtab:smartindent:tabstop=4:softtabstop=4:shiftwidth=4:
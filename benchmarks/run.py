@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#
+# Account extras benchmarks
+# Copyright (C) 2017 OpusVL (<http://opusvl.com/>)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+##############################################################################
+
+"""Measure the cost of the account extras modules against a database that has them installed.
+
+    python benchmarks/run.py -c odoo.conf -d bench --size 200 --save benchmarks/baseline.json
+    python benchmarks/run.py -c odoo.conf -d bench --size 200 --baseline benchmarks/baseline.json
+
+The database needs a chart of accounts and sale_stock besides the modules.  A fixture of --size orders is made, and
+committed, on the first run.  Each case is run --repeat times, each time in a savepoint that is rolled back, and its
+median wall time, number of queries and growth of the peak resident set size of the process are reported.  With
+--baseline, the exit status is 1 when a case has become slower or uses more memory by more than --tolerance, or runs
+more queries at all.  Run a single case with --case to have its peak memory measured on its own.
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import logging
+import resource
+import sys
+import time
+
+import openerp
+from openerp import api, SUPERUSER_ID
+
+from cases import CASES
+from fixture import ensure_fixture
+
+_logger = logging.getLogger('benchmarks')
+
+
+def peak_rss():
+    """Return the peak resident set size of the process so far, in kilobytes (as Linux reports it).
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def measure(env, case, size, repeat):
+    run = case(env, size)
+    env.invalidate_all()
+    times = []
+    queries = None
+    rss_before = peak_rss()
+    for _ in range(repeat):
+        env.cr.execute('savepoint benchmark')
+        count = env.cr.sql_log_count
+        start = time.time()
+        run()
+        times.append(time.time() - start)
+        if queries is None:
+            queries = env.cr.sql_log_count - count
+        env.cr.execute('rollback to savepoint benchmark')
+        env.invalidate_all()
+    times.sort()
+    return {
+        'wall': times[len(times) // 2],
+        'queries': queries,
+        'peak_rss_kb': peak_rss() - rss_before,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Print how results compare with baseline, and return the names of the cases that regressed.
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        slower = result['wall'] > base['wall'] * (1 + tolerance)
+        more_queries = result['queries'] > base['queries']
+        more_memory = result['peak_rss_kb'] > base['peak_rss_kb'] * (1 + tolerance) + 1024
+        print('%-28s wall %+7.1f%%  queries %+6d  peak rss %+8d KB%s' % (
+            name,
+            (result['wall'] / base['wall'] - 1) * 100 if base['wall'] else 0.0,
+            result['queries'] - base['queries'],
+            result['peak_rss_kb'] - base['peak_rss_kb'],
+            '  REGRESSION' if slower or more_queries or more_memory else '',
+        ))
+        if slower or more_queries or more_memory:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-c', '--config', help='Odoo configuration file')
+    parser.add_argument('-d', '--database', required=True)
+    parser.add_argument('--size', type=int, default=200, help='number of orders, pickings and moves (default 200)')
+    parser.add_argument('--repeat', type=int, default=5, help='runs of each case (default 5)')
+    parser.add_argument('--case', action='append', choices=list(CASES), help='case to run (default all)')
+    parser.add_argument('--baseline', help='JSON file of results to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed slowdown as a fraction (default 0.2)')
+    parser.add_argument('--save', help='JSON file to write the results to')
+    args = parser.parse_args(argv)
+
+    odoo_args = ['-d', args.database]
+    if args.config:
+        odoo_args[:0] = ['-c', args.config]
+    openerp.tools.config.parse_config(odoo_args)
+    registry = openerp.modules.registry.RegistryManager.get(args.database)
+
+    results = {}
+    with api.Environment.manage():
+        cr = registry.cursor()
+        try:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            ensure_fixture(env, args.size)
+            for name in args.case or CASES:
+                _logger.info('Running %s', name)
+                results[name] = result = measure(env, CASES[name], args.size, args.repeat)
+                print('%-28s wall %8.3fs  queries %6d  peak rss %+8d KB' % (
+                    name, result['wall'], result['queries'], result['peak_rss_kb'],
+                ))
+        finally:
+            cr.rollback()
+            cr.close()
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline.get('size') != args.size:
+            print('Baseline was taken with --size %s, not %s' % (baseline.get('size'), args.size), file=sys.stderr)
+        regressions = compare(results, baseline.get('cases', {}), args.tolerance)
+    if args.save:
+        with open(args.save, 'w') as save_file:
+            json.dump({'size': args.size, 'cases': results}, save_file, indent=2, sort_keys=True)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
+
+# vim:expandtab:smartindent:tabstop=4:softtabstop=4:shiftwidth=4:
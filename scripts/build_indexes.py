@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+##############################################################################
+#
+# Account extras index builder
+# Copyright (C) 2017 OpusVL (<http://opusvl.com/>)
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as
+# published by the Free Software Foundation, either version 3 of the
+# License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+##############################################################################
+
+"""Build the indexes the account extras modules want on large tables, without blocking writes to them.
+
+    python scripts/build_indexes.py -c odoo.conf -d dbname
+
+Run it after installing or updating the modules, with the server up if need be.  Module updates only build these
+indexes themselves on small tables, see the indexes.py of each module.  The indexes are built one after the other with
+CREATE INDEX CONCURRENTLY, which waits for the transactions running when it starts to end, so a long running one holds
+the build up (but nothing else).  Indexes left invalid by an interrupted build are rebuilt.
+"""
+
+import argparse
+import importlib
+import logging
+import sys
+from contextlib import closing
+
+import openerp
+from openerp import sql_db
+
+_logger = logging.getLogger('build_indexes')
+
+# Modules with an indexes.py, whose build_indexes() takes a cursor in autocommit mode.
+MODULES = [
+    'account_entries_report_extension_base',
+    'account_invoice_sale_link',
+    'account_invoice_stock_picking_link',
+]
+
+
+def installed_modules(cr):
+    cr.execute("select name from ir_module_module where state = 'installed' and name in %s", (tuple(MODULES),))
+    return set(name for name, in cr.fetchall())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-c', '--config', help='Odoo configuration file')
+    parser.add_argument('-d', '--database', required=True)
+    args = parser.parse_args(argv)
+
+    odoo_args = ['-d', args.database]
+    if args.config:
+        odoo_args[:0] = ['-c', args.config]
+    openerp.tools.config.parse_config(odoo_args)
+    openerp.modules.module.initialize_sys_path()
+
+    with closing(sql_db.db_connect(args.database).cursor()) as cr:
+        # No transaction may be left open on this connection while the indexes are built.
+        cr.autocommit(True)
+        installed = installed_modules(cr)
+        for module in MODULES:
+            if module not in installed:
+                continue
+            _logger.info('Building the indexes of %s', module)
+            importlib.import_module('openerp.addons.%s.indexes' % module).build_indexes(cr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
+
+# vim:expandtab:smartindent:tabstop=4:softtabstop=4:shiftwidth=4: